@@ -1,20 +1,75 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory, g, has_request_context, stream_with_context
+from flask import session as flask_session
+from flask.json.provider import DefaultJSONProvider
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session as FlaskSQLAlchemySession
 from flask_cors import CORS
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from flask_bcrypt import Bcrypt
 from werkzeug.utils import secure_filename
-from datetime import datetime
+from sqlalchemy import event, insert, update, delete, func, literal, inspect as sa_inspect
+from sqlalchemy.orm import joinedload
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool, NullPool
+from sqlalchemy.exc import IntegrityError, TimeoutError as PoolTimeoutError
+from datetime import datetime, date, timedelta, timezone
+from decimal import Decimal
 from functools import wraps
+from contextlib import contextmanager
 from dotenv import load_dotenv
+import click
 import os
 import json
-import openai
-import boto3
-from botocore.exceptions import ClientError
+import time
+import threading
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import uuid
+import itertools
+import copy
+import concurrent.futures
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+import atexit
+import bisect
+import sys
+import tempfile
+import hashlib
+import math
+import mmap
+import struct
+from collections import Counter as TallyCounter, namedtuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: rate limits apply per process only
+    fcntl = None
 
 load_dotenv()
-openai.api_key = os.getenv('OPENAI_API_KEY')
+
+
+def env_int(name, default):
+    """Read an integer setting from the environment"""
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+def env_float(name, default):
+    """Read a float setting from the environment"""
+    value = os.environ.get(name)
+    return float(value) if value not in (None, '') else default
+
+
+def env_bool(name, default):
+    """Read a boolean setting ('1', 'true', 'yes', 'on') from the environment"""
+    value = os.environ.get(name)
+    if value in (None, ''):
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
 
 # Create Flask app
 app = Flask(__name__)
@@ -28,13 +83,55 @@ S3_REGION = os.getenv('S3_REGION', 'us-east-1')  # Change to your region
 AWS_ACCESS_KEY = os.getenv('AWS_ACCESS_KEY_ID')
 AWS_SECRET_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
 
-# Initialize S3 client
-s3_client = boto3.client(
-    's3',
-    aws_access_key_id=AWS_ACCESS_KEY,
-    aws_secret_access_key=AWS_SECRET_KEY,
-    region_name=S3_REGION
-)
+# ============= SHARED CLIENTS =============
+# boto3 and openai are slow to import, so they are loaded on first use rather
+# than at startup. Each client is created once per process and shared by all
+# threads; both SDKs' clients are thread-safe.
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _shared_client(name, factory):
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = factory()
+    return client
+
+
+def _create_s3_client():
+    import boto3
+    return boto3.client(
+        's3',
+        aws_access_key_id=AWS_ACCESS_KEY,
+        aws_secret_access_key=AWS_SECRET_KEY,
+        region_name=S3_REGION
+    )
+
+
+def _create_openai_client():
+    from openai import OpenAI
+    return OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+
+
+def get_s3_client():
+    """Process-wide S3 client, created on first use"""
+    return _shared_client('s3', _create_s3_client)
+
+
+def get_openai_client():
+    """Process-wide OpenAI client, created on first use"""
+    return _shared_client('openai', _create_openai_client)
+
+
+def reset_shared_clients():
+    """Drop clients inherited from a parent process (called after gunicorn forks)"""
+    with _clients_lock:
+        _clients.clear()
+
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
 # Create uploads directory if it doesn't exist
@@ -48,9 +145,211 @@ CORS(app,
          'http://localhost:8080',
          'http://127.0.0.1:8080'
      ],
-     allow_headers=['Content-Type', 'Authorization'],
+     allow_headers=['Content-Type', 'Authorization', 'X-Request-ID'],
+     expose_headers=['X-Request-ID'],
      methods=['GET', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'])
 
+# ============= LOGGING =============
+# Log records are JSON lines tagged with the request ID. The request thread only
+# puts records on a bounded in-memory queue; a background listener thread does
+# the formatting and writing, and records are dropped rather than blocking when
+# the queue is full. Below WARNING, each request is sampled per endpoint:
+#   LOG_LEVEL=INFO, LOG_SAMPLE_RATE=1.0,
+#   LOG_SAMPLE_RATES=get_submissions=0.1,update_submission=0.5
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_QUEUE_SIZE = env_int('LOG_QUEUE_SIZE', 10000)
+LOG_SAMPLE_RATE = env_float('LOG_SAMPLE_RATE', 1.0)
+LOG_SAMPLE_RATES = {
+    endpoint.strip(): float(rate)
+    for endpoint, rate in (
+        item.split('=', 1) for item in os.environ.get('LOG_SAMPLE_RATES', '').split(',') if '=' in item
+    )
+}
+
+# Form fields whose values must never reach the logs
+SENSITIVE_FIELD_PATTERN = re.compile(
+    r'(email|phone|name|address|ssn|social|birth|dob|password|account|ein|tax|street|zip)',
+    re.IGNORECASE
+)
+REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._-]{1,128}$')
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as one JSON object per line"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.utcfromtimestamp(record.created).isoformat() + 'Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None)
+        }
+        entry.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RequestContextFilter(logging.Filter):
+    """Tags records with the request ID and drops unsampled low-level records"""
+
+    def filter(self, record):
+        if not has_request_context():
+            record.request_id = None
+            return True
+        record.request_id = g.get('request_id')
+        return record.levelno >= logging.WARNING or g.get('log_sampled', True)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks the request thread"""
+
+    dropped = 0
+
+    def prepare(self, record):
+        # Formatting happens on the listener thread; only copy what the record needs
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+
+class StructuredLogger(logging.LoggerAdapter):
+    """Logger that accepts structured fields as keyword arguments"""
+
+    def process(self, msg, kwargs):
+        fields = {
+            key: kwargs.pop(key) for key in list(kwargs)
+            if key not in ('exc_info', 'stack_info', 'stacklevel', 'extra')
+        }
+        kwargs['extra'] = {'fields': fields}
+        return msg, kwargs
+
+
+log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+_log_stream_handler = logging.StreamHandler()
+_log_stream_handler.setFormatter(JsonFormatter())
+_log_queue_handler = DroppingQueueHandler(log_queue)
+_log_queue_handler.addFilter(RequestContextFilter())
+
+_base_logger = logging.getLogger('estate_api')
+_base_logger.setLevel(LOG_LEVEL)
+_base_logger.addHandler(_log_queue_handler)
+_base_logger.propagate = False
+log = StructuredLogger(_base_logger, {})
+
+log_listener = None
+
+
+def start_log_listener():
+    """Start the background thread that writes queued records (again after a fork)"""
+    global log_listener
+    log_listener = logging.handlers.QueueListener(log_queue, _log_stream_handler)
+    log_listener.start()
+
+
+start_log_listener()
+atexit.register(lambda: log_listener.stop())
+
+
+def redact_payload(data):
+    """Copy of a request payload with personal values masked and long strings cut"""
+    if isinstance(data, dict):
+        return {
+            key: '[REDACTED]' if SENSITIVE_FIELD_PATTERN.search(str(key)) and value not in (None, '')
+            else redact_payload(value)
+            for key, value in data.items()
+        }
+    if isinstance(data, list):
+        return [redact_payload(item) for item in data]
+    if isinstance(data, str) and len(data) > 200:
+        return data[:200] + '...'
+    return data
+
+
+@app.before_request
+def assign_request_id():
+    """Reuse the caller's X-Request-ID or mint one, and decide log sampling"""
+    incoming = request.headers.get('X-Request-ID', '')
+    g.request_id = incoming if REQUEST_ID_PATTERN.match(incoming) else uuid.uuid4().hex
+    rate = LOG_SAMPLE_RATES.get(request.endpoint, LOG_SAMPLE_RATE)
+    g.log_sampled = rate >= 1 or random.random() < rate
+
+
+@app.after_request
+def add_request_id_header(response):
+    if has_request_context() and g.get('request_id'):
+        response.headers['X-Request-ID'] = g.request_id
+    return response
+
+# ============= JSON =============
+# API responses are encoded with orjson when it is installed, falling back to
+# the standard library otherwise. Both paths write dates and datetimes as ISO
+# 8601 strings, so routes can return model values directly. Stored JSON text
+# such as form_data can be wrapped in RawJSON to embed it without a decode and
+# re-encode round trip.
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+
+class RawJSON:
+    """Already-encoded JSON text to embed as-is in a response"""
+
+    __slots__ = ('text',)
+
+    def __init__(self, text):
+        self.text = text
+
+
+def _json_default(value):
+    """Encode values neither orjson nor the stdlib handle natively"""
+    if isinstance(value, RawJSON):
+        if orjson is not None and hasattr(orjson, 'Fragment'):
+            return orjson.Fragment(value.text)
+        return json.loads(value.text)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson when available"""
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            kwargs.setdefault('default', _json_default)
+            return json.dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_json_default).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return json.loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if orjson is None or self._app.debug:
+            # Readable, indented output in debug mode
+            return super().response(obj)
+        return self._app.response_class(
+            orjson.dumps(obj, default=_json_default),
+            mimetype=self.mimetype
+        )
+
+
+app.json = FastJSONProvider(app)
+
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
@@ -71,6 +370,140 @@ else:
     # Local SQLite
     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///estate_settlement.db'
 
+# ============= CONNECTION POOL =============
+# Pool settings come from the environment so each deployment can size the pool
+# to its worker count and the database's connection limit:
+#   DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING
+# Set DB_PGBOUNCER=true when DATABASE_URL points at PgBouncer in transaction
+# pooling mode; PgBouncer then owns pooling and we open a connection per checkout.
+
+class PoolStats:
+    """Thread-safe counters for how long requests wait to check out a connection"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_wait(self, seconds, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def snapshot(self):
+        with self._lock:
+            waits = self.checkouts + self.timeouts
+            return {
+                'checkouts': self.checkouts,
+                'checkout_timeouts': self.timeouts,
+                'wait_seconds_total': round(self.wait_total, 6),
+                'wait_seconds_avg': round(self.wait_total / waits, 6) if waits else 0.0,
+                'wait_seconds_max': round(self.wait_max, 6)
+            }
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a free connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Per pool, so the primary and replica engines report separately
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.record_wait(time.perf_counter() - start)
+        return conn
+
+
+def build_engine_options(database_uri):
+    """SQLAlchemy engine options for the configured database and environment"""
+    if database_uri.startswith('sqlite') and (database_uri == 'sqlite://' or ':memory:' in database_uri):
+        # In-memory SQLite needs SQLAlchemy's default single-connection pool
+        return {}
+    
+    if env_bool('DB_PGBOUNCER', False):
+        return {'poolclass': NullPool}
+    
+    return {
+        'poolclass': TimedQueuePool,
+        'pool_size': env_int('DB_POOL_SIZE', 5),
+        'max_overflow': env_int('DB_MAX_OVERFLOW', 10),
+        'pool_timeout': env_float('DB_POOL_TIMEOUT', 30),
+        'pool_recycle': env_int('DB_POOL_RECYCLE', 1800),  # Render drops idle connections
+        'pool_pre_ping': env_bool('DB_POOL_PRE_PING', True)
+    }
+
+
+def get_pool_status(engine):
+    """Current pool occupancy plus checkout wait statistics"""
+    pool = engine.pool
+    result = {'pool_class': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        result.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow()
+        })
+    if isinstance(pool, TimedQueuePool):
+        result.update(pool.stats.snapshot())
+    return result
+
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = build_engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+
+# ============= READ REPLICA ROUTING =============
+# When DATABASE_REPLICA_URL is set, endpoints decorated with @replica_read send
+# their SELECTs to the replica; flushes and writes always go to the primary.
+# After a user's own write, their reads stay on the primary for
+# DATABASE_REPLICA_RYW_SECONDS so they never see replica lag on their own changes.
+
+REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+if REPLICA_URL and REPLICA_URL.startswith('postgres://'):
+    REPLICA_URL = REPLICA_URL.replace('postgres://', 'postgresql://', 1)
+READ_YOUR_WRITES_SECONDS = env_float('DATABASE_REPLICA_RYW_SECONDS', 5)
+
+if REPLICA_URL:
+    app.config['SQLALCHEMY_BINDS'] = {
+        'replica': {'url': REPLICA_URL, **build_engine_options(REPLICA_URL)}
+    }
+
+
+class RoutingSession(FlaskSQLAlchemySession):
+    """Session that sends read-only statements to the replica when the request allows it"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and getattr(clause, 'is_select', False)
+                and has_request_context() and g.get('use_replica', False)):
+            return self._db.engines['replica']
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def recently_wrote():
+    """True if this client wrote within the read-your-writes window"""
+    last_write_at = flask_session.get('last_write_at', 0)
+    return time.time() - last_write_at < READ_YOUR_WRITES_SECONDS
+
+
+# Helper decorator for read-only routes that may be served from the replica
+def replica_read(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        g.use_replica = bool(REPLICA_URL) and not recently_wrote()
+        return f(*args, **kwargs)
+    return decorated_function
+
 # Session configuration for Flask-Login
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
 app.config['SESSION_COOKIE_SECURE'] = True  # HTTPS only
@@ -83,7 +516,329 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['SECRET_KEY'] = 'your-secret-key-change-this-later'
 
 # Initialize database
-db = SQLAlchemy(app)
+db = SQLAlchemy(app, session_options={'class_': RoutingSession})
+
+# ============= METRICS =============
+# Per-route latency, SQL statements per request and outbound S3/OpenAI call
+# times, exposed in Prometheus text format on /metrics. Values are kept per
+# worker process. Set METRICS_TOKEN to let scrapers in with "Authorization:
+# Bearer <token>"; without it only logged-in admins can read them.
+
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labelnames, labelvalues, extra=()):
+    pairs = list(zip(labelnames, labelvalues)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape_label(value)}"' for name, value in pairs) + '}'
+
+
+class Histogram:
+    """Thread-safe Prometheus histogram keyed by label values"""
+
+    def __init__(self, name, documentation, labelnames, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = {labels: (list(counts), total, count) for labels, (counts, total, count) in self._series.items()}
+        for labelvalues, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, labelvalues, [('le', bound)])
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f'{self.name}_sum{labels} {total}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class Gauge:
+    """Prometheus gauge whose samples are read from a callback at scrape time"""
+
+    def __init__(self, name, documentation, labelnames, collect):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.collect = collect
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} gauge']
+        for labelvalues, value in self.collect():
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labelvalues)} {value}')
+        return lines
+
+
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds', 'Request latency by route, method and status',
+    ('route', 'method', 'status'))
+REQUEST_SQL_STATEMENTS = Histogram(
+    'http_request_sql_statements', 'SQL statements issued per request',
+    ('route', 'method'), COUNT_BUCKETS)
+REQUEST_SQL_DURATION = Histogram(
+    'http_request_sql_duration_seconds', 'Time spent in SQL per request',
+    ('route', 'method'))
+OUTBOUND_DURATION = Histogram(
+    'outbound_request_duration_seconds', 'Latency of calls to external services',
+    ('dependency', 'operation', 'outcome'))
+
+
+def _collect_pool_metrics():
+    samples = []
+    engines = [('primary', db.engine)] + ([('replica', db.engines['replica'])] if REPLICA_URL else [])
+    for name, engine in engines:
+        status = get_pool_status(engine)
+        for key in ('size', 'checked_out', 'overflow', 'checkouts', 'checkout_timeouts', 'wait_seconds_total', 'wait_seconds_max'):
+            if key in status:
+                samples.append(((name, key), status[key]))
+    return samples
+
+
+METRICS = [
+    REQUEST_DURATION,
+    REQUEST_SQL_STATEMENTS,
+    REQUEST_SQL_DURATION,
+    OUTBOUND_DURATION,
+    Gauge('db_pool', 'Connection pool occupancy and checkout waits', ('database', 'stat'), _collect_pool_metrics),
+    Gauge('log_records_dropped', 'Log records dropped because the log queue was full', (),
+          lambda: [((), DroppingQueueHandler.dropped)])
+]
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start_sql_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _stop_sql_timer(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start'].pop()
+    if has_request_context():
+        g.sql_statements = g.get('sql_statements', 0) + 1
+        g.sql_seconds = g.get('sql_seconds', 0.0) + elapsed
+
+
+@contextmanager
+def track_dependency(dependency, operation):
+    """Time a call to an external service such as S3 or OpenAI"""
+    start = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'ok'
+    finally:
+        elapsed = time.perf_counter() - start
+        OUTBOUND_DURATION.observe(elapsed, dependency, operation, outcome)
+        if has_request_context():
+            g.outbound_seconds = g.get('outbound_seconds', 0.0) + elapsed
+
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    start = g.get('request_start')
+    if start is None:
+        return response
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    REQUEST_DURATION.observe(time.perf_counter() - start, route, request.method, str(response.status_code))
+    REQUEST_SQL_STATEMENTS.observe(g.get('sql_statements', 0), route, request.method)
+    REQUEST_SQL_DURATION.observe(g.get('sql_seconds', 0.0), route, request.method)
+    return response
+
+
+def render_metrics():
+    """All metrics in Prometheus text exposition format"""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus scrape endpoint"""
+    if METRICS_TOKEN:
+        if request.headers.get('Authorization') != f'Bearer {METRICS_TOKEN}':
+            return jsonify({'error': 'Authentication required'}), 401
+    elif not current_user.is_authenticated:
+        return jsonify({'error': 'Authentication required'}), 401
+    elif not current_user.is_admin():
+        return jsonify({'error': 'Admin access required'}), 403
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+# ============= REQUEST PROFILING =============
+# Admins can profile a single request by sending "X-Profile: 1" or "?profile=1";
+# PROFILE_SAMPLE_RATE additionally profiles that fraction of all requests.
+# A sampling thread records the request thread's stack every
+# PROFILE_INTERVAL_MS, so the profiled request runs at nearly full speed.
+# Stacks are saved in folded format (flamegraph.pl, speedscope) together with a
+# breakdown of samples spent in SQL, JSON encoding and outbound calls.
+
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'estate_api_profiles'))
+PROFILE_INTERVAL_MS = env_float('PROFILE_INTERVAL_MS', 5)
+PROFILE_SAMPLE_RATE = env_float('PROFILE_SAMPLE_RATE', 0.0)
+PROFILE_KEEP = env_int('PROFILE_KEEP', 50)
+
+# Module prefixes used to attribute samples to a category, checked leaf-first
+PROFILE_CATEGORIES = (
+    ('sql', ('sqlalchemy', 'psycopg2', 'sqlite3')),
+    ('outbound', ('boto3', 'botocore', 's3transfer', 'openai', 'httpx', 'httpcore', 'urllib3')),
+    ('json', ('json', 'flask.json'))
+)
+
+
+class SamplingProfiler:
+    """Samples one thread's call stack from a background thread"""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = TallyCounter()
+        self.categories = TallyCounter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self.started_at
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            category = 'other'
+            while frame is not None:
+                code = frame.f_code
+                module = frame.f_globals.get('__name__', '')
+                if category == 'other':
+                    for name, prefixes in PROFILE_CATEGORIES:
+                        if module.startswith(prefixes):
+                            category = name
+                            break
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+            self.categories[category] += 1
+
+    def folded(self):
+        """Stacks in folded format: 'root;...;leaf count' per line"""
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+def profile_requested():
+    """True if this request should be profiled"""
+    if request.headers.get('X-Profile') == '1' or request.args.get('profile') == '1':
+        return current_user.is_authenticated and current_user.is_admin()
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def save_profile(profile_id, profiler):
+    """Write the folded stacks and summary, keeping only the newest PROFILE_KEEP"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    summary = {
+        'id': profile_id,
+        'request_id': g.get('request_id'),
+        'route': request.url_rule.rule if request.url_rule else request.path,
+        'method': request.method,
+        'created_at': datetime.utcnow().isoformat(),
+        'duration_seconds': round(profiler.duration, 6),
+        'samples': sum(profiler.stacks.values()),
+        'interval_ms': PROFILE_INTERVAL_MS,
+        'sample_categories': dict(profiler.categories),
+        'sql_statements': g.get('sql_statements', 0),
+        'sql_seconds': round(g.get('sql_seconds', 0.0), 6),
+        'outbound_seconds': round(g.get('outbound_seconds', 0.0), 6)
+    }
+    with open(os.path.join(PROFILE_DIR, f'{profile_id}.folded'), 'w') as f:
+        f.write(profiler.folded())
+    with open(os.path.join(PROFILE_DIR, f'{profile_id}.json'), 'w') as f:
+        json.dump(summary, f)
+    
+    summaries = sorted(
+        (name for name in os.listdir(PROFILE_DIR) if name.endswith('.json')),
+        key=lambda name: os.path.getmtime(os.path.join(PROFILE_DIR, name))
+    )
+    for name in summaries[:-PROFILE_KEEP]:
+        for suffix in ('.json', '.folded'):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, name[:-len('.json')] + suffix))
+            except FileNotFoundError:
+                pass
+
+
+@app.before_request
+def start_profiler():
+    if request.endpoint in ('metrics', 'static') or not profile_requested():
+        return
+    g.profiler = SamplingProfiler(threading.get_ident(), PROFILE_INTERVAL_MS / 1000)
+    g.profiler.start()
+
+
+def finish_profiler():
+    """Stop and save this request's profile; returns its ID or None"""
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return None
+    profiler.stop()
+    # Generated here, never taken from X-Request-ID, so a client cannot overwrite another profile
+    profile_id = uuid.uuid4().hex
+    try:
+        save_profile(profile_id, profiler)
+    except OSError:
+        log.exception('Failed to save profile', profile_id=profile_id)
+        return None
+    return profile_id
+
+
+@app.after_request
+def stop_profiler(response):
+    profile_id = finish_profiler()
+    if profile_id:
+        response.headers['X-Profile-ID'] = profile_id
+    return response
+
+
+@app.teardown_request
+def stop_profiler_on_error(exc):
+    # after_request does not run when a view raises
+    if g.get('profiler') is not None:
+        finish_profiler()
 
 # ============= DATABASE MODELS =============
 # These define what tables and columns your database will have
@@ -163,6 +918,10 @@ class StateLimit(db.Model):
 
 class Submission(db.Model):
     """Estate settlement submissions from users"""
+    # Archived rows keep their id, so SQLite must never hand a freed id out again.
+    # Only applies when the table is created; see migrate_db for existing files.
+    __table_args__ = {'sqlite_autoincrement': True}
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
     
@@ -184,7 +943,7 @@ class Submission(db.Model):
     has_disputes = db.Column(db.Boolean)
     
    # Document Upload
-    trust_document_path = db.Column(db.String(500), nullable=True)
+    trust_document_path = db.Column(db.String(500), nullable=True, index=True)
     trust_document_filename = db.Column(db.String(500), nullable=True)
 
     # Referral Type (determined by logic)
@@ -193,6 +952,7 @@ class Submission(db.Model):
     # Status and Assignment
     status = db.Column(db.String(50), default='submitted')
     attorney_id = db.Column(db.Integer, db.ForeignKey('attorney.id'), nullable=True)
+    attorney = db.relationship('Attorney', lazy=True)
     notes = db.Column(db.Text, nullable=True)
     
     # Complete Form Data (JSON)
@@ -204,8 +964,107 @@ class Submission(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+
+class ArchivedSubmission(db.Model):
+    """
+    Closed submissions moved out of the hot table by the archiver. Mirrors
+    Submission column for column (rows move with INSERT ... SELECT), plus
+    archived_at. Ids are kept, so archived cases stay reachable by id.
+    """
+    __tablename__ = 'submission_archive'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), index=True)
+    user = db.relationship('User', lazy=True)
+    
+    contact_email = db.Column(db.String(120))
+    contact_phone = db.Column(db.String(20))
+    relationship_to_deceased = db.Column(db.String(100))
+    
+    decedent_first_name = db.Column(db.String(100))
+    decedent_last_name = db.Column(db.String(100))
+    decedent_date_of_death = db.Column(db.Date)
+    decedent_state = db.Column(db.String(50))
+    
+    estate_value = db.Column(db.Float)
+    has_will = db.Column(db.Boolean)
+    has_trust = db.Column(db.Boolean)
+    has_disputes = db.Column(db.Boolean)
+    
+    # Indexed for the S3 orphan scan, which checks keys against both tables
+    trust_document_path = db.Column(db.String(500), nullable=True, index=True)
+    trust_document_filename = db.Column(db.String(500), nullable=True)
+    
+    referral_type = db.Column(db.String(50))
+    status = db.Column(db.String(50))
+    attorney_id = db.Column(db.Integer, db.ForeignKey('attorney.id'), nullable=True)
+    attorney = db.relationship('Attorney', lazy=True)
+    notes = db.Column(db.Text, nullable=True)
+    form_data = db.Column(db.Text, nullable=True)
+    document_summary = db.Column(db.Text, nullable=True)
+    
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class MaintenanceCursor(db.Model):
+    """Where an incremental background job (e.g. the S3 orphan scan) left off"""
+    name = db.Column(db.String(100), primary_key=True)
+    value = db.Column(db.String(1024), nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 # ============= HELPER FUNCTIONS =============
 
+# Related rows that submission endpoints can embed with ?expand=attorney,user
+SUBMISSION_EXPANSIONS = ('attorney', 'user')
+
+
+def parse_expand():
+    """Requested expansions from ?expand=, or raise ValueError for unknown names"""
+    names = {name.strip() for name in request.args.get('expand', '').split(',') if name.strip()}
+    unknown = names - set(SUBMISSION_EXPANSIONS)
+    if unknown:
+        raise ValueError(f"Unknown expand value(s): {', '.join(sorted(unknown))}. "
+                         f"Must be one of: {list(SUBMISSION_EXPANSIONS)}")
+    return names
+
+
+def expand_options(expand, model=None):
+    """Eager-load the expanded relations in the same query as the submissions"""
+    model = model or Submission
+    return [joinedload(getattr(model, name)) for name in sorted(expand)]
+
+
+def attorney_to_dict(attorney):
+    return {
+        'id': attorney.id,
+        'name': f"{attorney.first_name} {attorney.last_name}",
+        'email': attorney.email,
+        'phone': attorney.phone,
+        'state': attorney.state,
+        'specialties': attorney.specialties.split(',') if attorney.specialties else []
+    }
+
+
+def user_to_dict(user):
+    return {
+        'id': user.id,
+        'email': user.email,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'role': user.role
+    }
+
+
+def add_expansions(result, submission, expand):
+    """Embed expanded relations into a serialized submission"""
+    if 'attorney' in expand:
+        result['attorney'] = attorney_to_dict(submission.attorney) if submission.attorney else None
+    if 'user' in expand:
+        result['user'] = user_to_dict(submission.user) if submission.user else None
+    return result
+
+
 def determine_referral_type(estate_value, has_trust, has_disputes, state):
     """
     Logic to determine which type of estate settlement process is needed
@@ -229,8 +1088,972 @@ def determine_referral_type(estate_value, has_trust, has_disputes, state):
     # Otherwise, informal probate
     return 'informal'
 
+# ============= ATTORNEY ASSIGNMENT =============
+# Picks the active attorney licensed in the case's state with the matching
+# specialty and the fewest open cases. Open-case counts live in an in-memory
+# index that is loaded once with a single GROUP BY and then adjusted as
+# submissions are committed, so choosing an attorney costs no queries.
+# Each worker process keeps its own index; it is reloaded every
+# CASELOAD_REFRESH_SECONDS to pick up changes made by other workers, and after
+# bulk UPDATE/DELETE statements the ORM cannot track row by row.
+# AUTO_ASSIGN_ATTORNEYS=true assigns an attorney to every new submission.
+
+TERMINAL_STATUSES = {
+    status.strip() for status in os.environ.get('TERMINAL_STATUSES', 'completed,closed').split(',') if status.strip()
+}
+AUTO_ASSIGN_ATTORNEYS = env_bool('AUTO_ASSIGN_ATTORNEYS', False)
+CASELOAD_REFRESH_SECONDS = env_float('CASELOAD_REFRESH_SECONDS', 300)
+
+
+def is_open_status(status):
+    # New submissions get the 'submitted' default only when inserted
+    return (status or 'submitted') not in TERMINAL_STATUSES
+
+
+def open_status_clause():
+    """SQL counterpart of is_open_status: a missing status counts as open"""
+    return db.or_(Submission.status.is_(None), Submission.status.notin_(TERMINAL_STATUSES))
+
+
+class CaseloadIndex:
+    """Open-case count per attorney plus the active attorney roster"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+        self._roster = []
+        self._loaded_at = None
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def _ensure_loaded(self):
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < CASELOAD_REFRESH_SECONDS:
+            return
+        counts = dict(db.session.execute(
+            db.select(Submission.attorney_id, func.count())
+            .where(Submission.attorney_id.isnot(None), open_status_clause())
+            .group_by(Submission.attorney_id)
+        ).all())
+        roster = [
+            (attorney.id, (attorney.state or '').strip().lower(),
+             {specialty.strip() for specialty in (attorney.specialties or '').split(',') if specialty.strip()})
+            for attorney in db.session.execute(
+                db.select(Attorney).where(Attorney.is_active.is_(True))
+            ).scalars()
+        ]
+        with self._lock:
+            self._counts = counts
+            self._roster = roster
+            self._loaded_at = time.monotonic()
+
+    def apply(self, deltas):
+        """Apply committed (attorney_id, +1/-1) changes"""
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            for attorney_id, delta in deltas:
+                self._counts[attorney_id] = self._counts.get(attorney_id, 0) + delta
+
+    def open_cases(self, attorney_id):
+        self._ensure_loaded()
+        with self._lock:
+            return self._counts.get(attorney_id, 0)
+
+    def snapshot(self):
+        self._ensure_loaded()
+        with self._lock:
+            return dict(self._counts), list(self._roster)
+
+
+caseload_index = CaseloadIndex()
+
+
+def candidate_attorneys(roster, state, referral_type):
+    state = (state or '').strip().lower()
+    return [attorney_id for attorney_id, attorney_state, specialties in roster
+            if attorney_state == state and referral_type in specialties]
+
+
+def pick_attorney(state, referral_type, counts=None, roster=None):
+    """Least-loaded matching attorney id, or None if nobody matches"""
+    if counts is None or roster is None:
+        counts, roster = caseload_index.snapshot()
+    candidates = candidate_attorneys(roster, state, referral_type)
+    if not candidates:
+        return None
+    return min(candidates, key=lambda attorney_id: (counts.get(attorney_id, 0), attorney_id))
+
+
+def assign_attorneys(submissions):
+    """
+    Assign attorneys to many (id, decedent_state, referral_type, attorney_id, status)
+    rows in one pass. Counts are updated as we go so the batch itself stays
+    balanced. Returns ({submission_id: attorney_id or None}, caseload deltas);
+    the caller writes the assignments and commits.
+    """
+    counts, roster = caseload_index.snapshot()
+    assignments = {}
+    deltas = []
+    for submission_id, state, referral_type, current_attorney_id, status in submissions:
+        if current_attorney_id is not None and is_open_status(status):
+            # Reassigning: the current attorney's case is released first
+            counts[current_attorney_id] = counts.get(current_attorney_id, 0) - 1
+        attorney_id = pick_attorney(state, referral_type, counts, roster)
+        if attorney_id is None:
+            if current_attorney_id is not None and is_open_status(status):
+                counts[current_attorney_id] += 1
+            assignments[submission_id] = None
+            continue
+        assignments[submission_id] = attorney_id
+        counts[attorney_id] = counts.get(attorney_id, 0) + 1
+        if current_attorney_id is not None and is_open_status(status):
+            deltas.append((current_attorney_id, -1))
+        deltas.append((attorney_id, 1))
+    return assignments, deltas
+
+
+def _attribute_before(obj, name):
+    history = sa_inspect(obj).attrs[name].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(obj, name)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _collect_caseload_changes(session, flush_context):
+    deltas = session.info.setdefault('caseload_deltas', [])
+    for obj in session.new:
+        if isinstance(obj, Submission) and obj.attorney_id is not None and is_open_status(obj.status):
+            deltas.append((obj.attorney_id, 1))
+        elif isinstance(obj, Attorney):
+            session.info['roster_changed'] = True
+    for obj in session.dirty:
+        if isinstance(obj, Submission):
+            old_attorney, old_status = _attribute_before(obj, 'attorney_id'), _attribute_before(obj, 'status')
+            if (old_attorney, is_open_status(old_status)) == (obj.attorney_id, is_open_status(obj.status)):
+                continue
+            if old_attorney is not None and is_open_status(old_status):
+                deltas.append((old_attorney, -1))
+            if obj.attorney_id is not None and is_open_status(obj.status):
+                deltas.append((obj.attorney_id, 1))
+        elif isinstance(obj, Attorney):
+            session.info['roster_changed'] = True
+    for obj in session.deleted:
+        if isinstance(obj, Submission):
+            old_attorney, old_status = _attribute_before(obj, 'attorney_id'), _attribute_before(obj, 'status')
+            if old_attorney is not None and is_open_status(old_status):
+                deltas.append((old_attorney, -1))
+        elif isinstance(obj, Attorney):
+            session.info['roster_changed'] = True
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _detect_bulk_caseload_changes(orm_execute_state):
+    # Set-based UPDATE/DELETE bypass the flush, so recount after commit
+    if ((orm_execute_state.is_update or orm_execute_state.is_delete)
+            and not orm_execute_state.execution_options.get('caseload_tracked')):
+        orm_execute_state.session.info['caseload_stale'] = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _apply_caseload_changes(session):
+    deltas = session.info.pop('caseload_deltas', [])
+    if session.info.pop('caseload_stale', False) or session.info.pop('roster_changed', False):
+        caseload_index.invalidate()
+    elif deltas:
+        caseload_index.apply(deltas)
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _discard_caseload_changes(session):
+    for key in ('caseload_deltas', 'caseload_stale', 'roster_changed'):
+        session.info.pop(key, None)
+
+# ============= S3 DOCUMENT CLEANUP =============
+# Documents whose submission is deleted, or that are replaced by a new upload,
+# are queued after the transaction commits. A background thread deletes them
+# with batched delete_objects calls (up to 1000 keys each), so requests never
+# wait on S3. Keys still pending at shutdown are drained on exit. Anything
+# missed (a crash, an S3 outage) is caught by the orphan scan, which walks the
+# documents/ prefix one page per run from a cursor stored in the database.
+
+DOCUMENT_PREFIX = 'documents/'
+S3_SWEEP_BATCH_SIZE = min(env_int('S3_SWEEP_BATCH_SIZE', 1000), 1000)  # delete_objects limit
+S3_SWEEP_INTERVAL = env_float('S3_SWEEP_INTERVAL', 2.0)
+S3_SWEEP_RETRIES = env_int('S3_SWEEP_RETRIES', 3)
+ORPHAN_GRACE_HOURS = env_float('ORPHAN_GRACE_HOURS', 24)
+
+
+class S3Sweeper:
+    """Background deleter that batches queued S3 keys into delete_objects calls"""
+
+    def __init__(self, batch_size=S3_SWEEP_BATCH_SIZE, interval=S3_SWEEP_INTERVAL):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.deleted = 0
+        self.failed = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def enqueue(self, keys):
+        keys = [key for key in keys if key and key.startswith(DOCUMENT_PREFIX)]
+        if not keys:
+            return
+        self._ensure_started()
+        for key in keys:
+            self._queue.put(key)
+
+    def _ensure_started(self):
+        # Started on first use, so each forked gunicorn worker gets its own thread
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='s3-sweeper', daemon=True)
+                self._thread.start()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                self.delete_now(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def delete_now(self, keys):
+        """Delete keys synchronously in batches, retrying failures with backoff"""
+        keys = list(dict.fromkeys(keys))
+        for start in range(0, len(keys), self.batch_size):
+            pending = keys[start:start + self.batch_size]
+            # A key queued by one row may have since been (re)assigned to another
+            try:
+                with app.app_context():
+                    referenced = referenced_documents(pending)
+            except Exception:
+                log.exception('Could not check S3 keys against the database', keys=len(pending))
+                self.failed += len(pending)
+                continue
+            pending = [key for key in pending if key not in referenced]
+            if not pending:
+                continue
+            for attempt in range(1, S3_SWEEP_RETRIES + 1):
+                try:
+                    with track_dependency('s3', 'delete_objects'):
+                        response = get_s3_client().delete_objects(
+                            Bucket=S3_BUCKET,
+                            Delete={'Objects': [{'Key': key} for key in pending], 'Quiet': True}
+                        )
+                    errors = response.get('Errors', [])
+                except Exception:
+                    log.exception('S3 batch delete failed', keys=len(pending), attempt=attempt)
+                    errors = [{'Key': key} for key in pending]
+                
+                self.deleted += len(pending) - len(errors)
+                pending = [error['Key'] for error in errors]
+                if not pending:
+                    break
+                time.sleep(min(2 ** attempt, 30))
+            
+            if pending:
+                self.failed += len(pending)
+                log.warning('S3 keys left for the orphan scan', keys=len(pending))
+
+    def drain(self, timeout=None):
+        """Wait (up to timeout seconds) for queued keys to be deleted"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if self._thread is None or not self._thread.is_alive():
+                return False
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+
+s3_sweeper = S3Sweeper()
+atexit.register(lambda: s3_sweeper.drain(timeout=10))
+
+
+def schedule_document_cleanup(keys):
+    """Delete these S3 keys once the current transaction commits"""
+    db.session.info.setdefault('s3_cleanup', []).extend(key for key in keys if key)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _collect_replaced_documents(session, flush_context):
+    keys = session.info.setdefault('s3_cleanup', [])
+    for obj in session.deleted:
+        if isinstance(obj, Submission):
+            keys.append(_attribute_before(obj, 'trust_document_path'))
+    for obj in session.dirty:
+        if isinstance(obj, Submission):
+            history = sa_inspect(obj).attrs['trust_document_path'].history
+            keys.extend(key for key in history.deleted if key and key not in history.added)
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _sweep_committed_documents(session):
+    keys = session.info.pop('s3_cleanup', [])
+    if keys:
+        s3_sweeper.enqueue(keys)
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _discard_document_cleanup(session):
+    session.info.pop('s3_cleanup', None)
+
+
+def referenced_documents(keys):
+    """The subset of keys that a submission, live or archived, still points at"""
+    return set(db.session.execute(
+        db.select(Submission.trust_document_path).where(Submission.trust_document_path.in_(keys)).union(
+            db.select(ArchivedSubmission.trust_document_path).where(ArchivedSubmission.trust_document_path.in_(keys)))
+    ).scalars())
+
+
+def scan_orphaned_documents(pages=1, dry_run=False):
+    """
+    Check the next `pages` pages (1000 keys each) of the documents/ prefix
+    against the database and queue unreferenced objects older than
+    ORPHAN_GRACE_HOURS for deletion. Resumes where the previous run stopped
+    and wraps around at the end of the prefix.
+    """
+    cursor = db.session.get(MaintenanceCursor, 's3_orphan_scan') or MaintenanceCursor(name='s3_orphan_scan')
+    start_after = cursor.value or ''
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=ORPHAN_GRACE_HOURS)
+    scanned = 0
+    orphans = []
+    
+    for _ in range(pages):
+        params = {'Bucket': S3_BUCKET, 'Prefix': DOCUMENT_PREFIX, 'MaxKeys': 1000}
+        if start_after:
+            params['StartAfter'] = start_after
+        with track_dependency('s3', 'list_objects_v2'):
+            page = get_s3_client().list_objects_v2(**params)
+        objects = page.get('Contents', [])
+        if objects:
+            referenced = referenced_documents([obj['Key'] for obj in objects])
+            # Recent objects may belong to an upload whose commit is still in flight
+            orphans.extend(obj['Key'] for obj in objects
+                           if obj['Key'] not in referenced and obj['LastModified'] < cutoff)
+            scanned += len(objects)
+        start_after = objects[-1]['Key'] if objects and page.get('IsTruncated') else ''
+        if not start_after:
+            break
+    
+    cursor.value = start_after
+    db.session.add(cursor)
+    db.session.commit()
+    
+    if orphans and not dry_run:
+        s3_sweeper.enqueue(orphans)
+    return {'scanned': scanned, 'orphans': len(orphans), 'next_start_after': start_after or None, 'dry_run': dry_run}
+
+
+@app.cli.command('s3-orphan-scan')
+@click.option('--pages', default=1, help='Pages of 1000 keys to check this run')
+@click.option('--dry-run', is_flag=True, help='Report orphans without deleting them')
+def s3_orphan_scan_command(pages, dry_run):
+    """Reconcile the documents/ prefix against the database (for a cron job)"""
+    result = scan_orphaned_documents(pages=pages, dry_run=dry_run)
+    s3_sweeper.drain()
+    click.echo(json.dumps(result))
+
+# ============= SUBMISSION ARCHIVE =============
+# Submissions in an ARCHIVE_STATUSES status that have not changed for
+# ARCHIVE_AFTER_DAYS are moved to submission_archive in batches, so the hot
+# table and its indexes only hold cases still being worked. Each batch is one
+# short INSERT ... SELECT + DELETE transaction; rows are locked with SKIP
+# LOCKED on Postgres so concurrent runs never collide. Runs resume from a
+# cursor and wrap around. Archived cases stay readable by id, their documents
+# stay in S3, and an admin can restore one to the hot table.
+
+ARCHIVE_STATUSES = {
+    status.strip() for status in os.environ.get('ARCHIVE_STATUSES', ','.join(sorted(TERMINAL_STATUSES))).split(',')
+    if status.strip()
+}
+ARCHIVE_AFTER_DAYS = env_float('ARCHIVE_AFTER_DAYS', 90)
+ARCHIVE_BATCH_SIZE = env_int('ARCHIVE_BATCH_SIZE', 500)
+ARCHIVE_PAUSE_SECONDS = env_float('ARCHIVE_PAUSE_SECONDS', 0.1)  # between batches, to let other writes in
+
+SUBMISSION_COLUMNS = [column.name for column in Submission.__table__.columns]
+
+
+def find_submission(submission_id, expand=()):
+    """A submission by id from the hot table, falling back to the archive"""
+    submission = Submission.query.options(*expand_options(expand)).filter_by(id=submission_id).first()
+    if submission is None:
+        submission = ArchivedSubmission.query.options(
+            *expand_options(expand, ArchivedSubmission)).filter_by(id=submission_id).first()
+    return submission
+
+
+def archive_submissions(batches=1, batch_size=ARCHIVE_BATCH_SIZE, dry_run=False):
+    """
+    Move up to `batches` batches of eligible submissions to the archive,
+    continuing from where the previous run stopped. With dry_run, only
+    count what would move.
+    """
+    cursor = db.session.get(MaintenanceCursor, 'submission_archive') or MaintenanceCursor(name='submission_archive')
+    last_id = int(cursor.value or 0)
+    cutoff = datetime.utcnow() - timedelta(days=ARCHIVE_AFTER_DAYS)
+    eligible = db.and_(Submission.status.in_(ARCHIVE_STATUSES), Submission.updated_at < cutoff)
+    examined = archived = 0
+    
+    for batch in range(batches):
+        if batch and ARCHIVE_PAUSE_SECONDS and not dry_run:
+            time.sleep(ARCHIVE_PAUSE_SECONDS)
+        ids = db.session.execute(
+            db.select(Submission.id).where(Submission.id > last_id, eligible)
+            .order_by(Submission.id).limit(batch_size).with_for_update(skip_locked=True)
+        ).scalars().all()
+        examined += len(ids)
+        # A short batch means the end of the table; the next run starts over
+        last_id = ids[-1] if len(ids) == batch_size else 0
+        
+        if ids and not dry_run:
+            # The predicate is repeated so a case reopened since the select stays put
+            moving = db.and_(Submission.id.in_(ids), eligible)
+            db.session.execute(insert(ArchivedSubmission).from_select(
+                SUBMISSION_COLUMNS + ['archived_at'],
+                db.select(*[Submission.__table__.c[name] for name in SUBMISSION_COLUMNS],
+                          literal(datetime.utcnow())).where(moving)
+            ))
+            # Archived cases are closed, so attorney caseloads are unaffected
+            result = db.session.execute(
+                delete(Submission).where(moving).execution_options(synchronize_session=False, caseload_tracked=True))
+            archived += result.rowcount
+        
+        if not dry_run:
+            cursor.value = str(last_id)
+            db.session.add(cursor)
+        db.session.commit()
+        if not last_id:
+            break
+    
+    return {'examined': examined, 'archived': archived, 'next_after_id': last_id or None, 'dry_run': dry_run}
+
+
+@app.cli.command('archive-submissions')
+@click.option('--batches', default=20, help=f'Batches of ARCHIVE_BATCH_SIZE ({ARCHIVE_BATCH_SIZE}) to move this run')
+@click.option('--dry-run', is_flag=True, help='Count eligible submissions without moving them')
+def archive_submissions_command(batches, dry_run):
+    """Move closed, idle submissions to the archive table (for a cron job)"""
+    click.echo(json.dumps(archive_submissions(batches=batches, dry_run=dry_run)))
+
+# ============= DRAFT AUTOSAVE =============
+# The intake form autosaves each step as a delta against the stored form_data,
+# either a JSON Merge Patch (RFC 7396) object or a JSON Patch (RFC 6902) list
+# of operations. Patched paths that feed a Submission column update that
+# column: the flat keys directly, and the nested answers through the same
+# derivation the review step uses. The referral type is recalculated only when
+# one of its inputs actually changed. Payloads are never logged, only the
+# top-level keys they touch.
+
+MERGE_PATCH_TYPE = 'application/merge-patch+json'
+JSON_PATCH_TYPE = 'application/json-patch+json'
+DRAFT_PATCH_MAX_OPERATIONS = env_int('DRAFT_PATCH_MAX_OPERATIONS', 200)
+
+# form_data keys that are also stored as columns, and the ones referral type depends on
+FORM_COLUMNS = (
+    'contact_email', 'contact_phone', 'relationship_to_deceased', 'decedent_first_name', 'decedent_last_name',
+    'decedent_date_of_death', 'decedent_state', 'estate_value', 'has_will', 'has_trust', 'has_disputes'
+)
+REFERRAL_INPUTS = ('estate_value', 'has_trust', 'has_disputes', 'decedent_state')
+
+# Flat form_data keys derived from a nested answer, with the value used when it is
+# missing (mirrors flatData in frontend/src/components/intake/ReviewStep.tsx)
+NESTED_FORM_COLUMNS = {
+    'contact_email': (('contactInfo', 'email'), ''),
+    'contact_phone': (('contactInfo', 'phone'), ''),
+    'relationship_to_deceased': (('contactInfo', 'relationshipToDecedent'), ''),
+    'decedent_first_name': (('decedentInfo', 'name'), ''),
+    'decedent_last_name': (('decedentInfo', 'name'), ''),
+    'decedent_date_of_death': (('decedentInfo', 'dateOfDeath'), ''),
+    'decedent_state': (('decedentInfo', 'domicileState'), ''),
+    'estate_value': (('totalNetAssetValue',), 0),
+    'has_trust': (('hasEstatePlan',), False),
+    'has_disputes': (('hasContestingBeneficiaries',), False),
+}
+
+
+class PatchError(ValueError):
+    """A patch that is malformed or cannot be applied to the document"""
+
+
+class PatchTestFailed(PatchError):
+    """A JSON Patch "test" operation did not match the stored value"""
+
+
+def merge_patch(target, patch):
+    """Apply a JSON Merge Patch, copying only the objects along patched paths"""
+    if not isinstance(patch, dict):
+        return patch
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = merge_patch(result.get(key), value)
+    return result
+
+
+def parse_pointer(pointer):
+    """Split a JSON Pointer into reference tokens"""
+    if pointer == '':
+        return []
+    if not isinstance(pointer, str) or not pointer.startswith('/'):
+        raise PatchError(f'Invalid JSON pointer: {pointer!r}')
+    return [token.replace('~1', '/').replace('~0', '~') for token in pointer[1:].split('/')]
+
+
+def _list_index(container, token, allow_end=False):
+    if allow_end and token == '-':
+        return len(container)
+    if not token.isdigit() or (token != '0' and token.startswith('0')):
+        raise PatchError(f'Invalid array index: {token!r}')
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise PatchError(f'Array index out of range: {token}')
+    return index
+
+
+def _resolve(document, tokens):
+    """The container holding the last token, walking every token before it"""
+    container = document
+    for token in tokens[:-1]:
+        if isinstance(container, dict) and token in container:
+            container = container[token]
+        elif isinstance(container, list):
+            container = container[_list_index(container, token)]
+        else:
+            raise PatchError(f'Path not found: /{"/".join(tokens)}')
+    if not isinstance(container, (dict, list)):
+        raise PatchError(f'Path not found: /{"/".join(tokens)}')
+    return container
+
+
+def _get(document, tokens):
+    if not tokens:
+        return document
+    container = _resolve(document, tokens)
+    if isinstance(container, list):
+        return container[_list_index(container, tokens[-1])]
+    if tokens[-1] not in container:
+        raise PatchError(f'Path not found: /{"/".join(tokens)}')
+    return container[tokens[-1]]
+
+
+def _remove(document, tokens):
+    value = _get(document, tokens)
+    container = _resolve(document, tokens)
+    if isinstance(container, list):
+        del container[_list_index(container, tokens[-1])]
+    else:
+        del container[tokens[-1]]
+    return value
+
+
+def _add(document, tokens, value):
+    if not tokens:
+        return value
+    container = _resolve(document, tokens)
+    if isinstance(container, list):
+        container.insert(_list_index(container, tokens[-1], allow_end=True), value)
+    else:
+        container[tokens[-1]] = value
+    return document
+
+
+def apply_json_patch(document, operations):
+    """
+    Apply a JSON Patch. The document is modified in place (the root may be
+    replaced, so use the return value); callers discard it if this raises.
+    """
+    if not isinstance(operations, list):
+        raise PatchError('A JSON Patch must be a list of operations')
+    for operation in operations:
+        if not isinstance(operation, dict) or 'op' not in operation or 'path' not in operation:
+            raise PatchError('Each operation needs "op" and "path"')
+        op = operation['op']
+        tokens = parse_pointer(operation['path'])
+        if op in ('add', 'replace', 'test') and 'value' not in operation:
+            raise PatchError(f'"{op}" needs a "value"')
+        
+        if op == 'add':
+            document = _add(document, tokens, copy.deepcopy(operation['value']))
+        elif op == 'remove':
+            if not tokens:
+                raise PatchError('Cannot remove the whole document')
+            _remove(document, tokens)
+        elif op == 'replace':
+            if tokens:
+                _get(document, tokens)
+                container = _resolve(document, tokens)
+                key = _list_index(container, tokens[-1]) if isinstance(container, list) else tokens[-1]
+                container[key] = copy.deepcopy(operation['value'])
+            else:
+                document = copy.deepcopy(operation['value'])
+        elif op in ('move', 'copy'):
+            source = parse_pointer(operation.get('from'))
+            if op == 'move' and tokens[:len(source)] == source and tokens != source:
+                raise PatchError('Cannot move a value into one of its children')
+            value = _remove(document, source) if op == 'move' else copy.deepcopy(_get(document, source))
+            document = _add(document, tokens, value)
+        elif op == 'test':
+            if _get(document, tokens) != operation['value']:
+                raise PatchTestFailed(f'Test failed at {operation["path"]}')
+        else:
+            raise PatchError(f'Unsupported operation: {op!r}')
+    return document
+
+
+def patched_paths(operations):
+    """form_data paths a JSON Patch touches, or None if it replaces the root"""
+    paths = []
+    for operation in operations:
+        for pointer in (operation.get('path'), operation.get('from')):
+            if pointer is None:
+                continue
+            tokens = parse_pointer(pointer)
+            if not tokens:
+                return None
+            paths.append(tuple(tokens))
+    return paths
+
+
+def merge_patch_paths(patch, prefix=()):
+    """form_data paths a JSON Merge Patch sets or removes"""
+    paths = []
+    for key, value in patch.items():
+        if isinstance(value, dict) and value:
+            paths.extend(merge_patch_paths(value, prefix + (key,)))
+        else:
+            paths.append(prefix + (key,))
+    return paths
+
+
+def _nested_value(form_data, path):
+    value = form_data
+    for key in path:
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+
+def sync_form_columns(form_data, paths):
+    """
+    Refresh the flat keys derived from any nested answer on the given paths and
+    return every column the paths feed
+    """
+    columns = {path[0] for path in paths if path and path[0] in FORM_COLUMNS}
+    for column, (nested, default) in NESTED_FORM_COLUMNS.items():
+        if not any(path[:len(nested)] == nested[:len(path)] for path in paths):
+            continue
+        value = _nested_value(form_data, nested) or default
+        if column in ('decedent_first_name', 'decedent_last_name'):
+            parts = value.split(' ') if isinstance(value, str) else ['']
+            value = parts[0] if column == 'decedent_first_name' else ' '.join(parts[1:])
+        form_data[column] = value
+        columns.add(column)
+    return columns
+
+
+def apply_form_columns(submission, form_data, keys):
+    """Copy the given flat form_data keys onto their columns"""
+    for key in FORM_COLUMNS:
+        if key not in keys:
+            continue
+        value = form_data.get(key)
+        if key == 'decedent_date_of_death':
+            value = datetime.strptime(value, '%Y-%m-%d') if value else None
+        setattr(submission, key, value)
+
+
+# ============= RATE LIMITING =============
+# Expensive endpoints are guarded by per-user token buckets and a concurrency
+# limit shared by every gunicorn worker on the host. State lives in a small
+# memory-mapped file (on /dev/shm when available) guarded by a process-wide
+# file lock, so an admission decision is a few microseconds and never touches
+# the database. Each in-flight request holds a lease stamped with its pid and
+# a deadline; leases left behind by a killed worker are reclaimed once the
+# pid is gone or the deadline passes. Rejected requests get 429 + Retry-After.
+
+RATE_LIMIT_ENABLED = env_bool('RATE_LIMIT_ENABLED', True)
+RATE_LIMIT_FILE = os.environ.get('RATE_LIMIT_FILE') or os.path.join(
+    '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), 'estate_rate_limits')
+RATE_LIMIT_BUCKET_SLOTS = env_int('RATE_LIMIT_BUCKET_SLOTS', 4096)
+RATE_LIMIT_LEASE_SLOTS = env_int('RATE_LIMIT_LEASE_SLOTS', 256)
+RATE_LIMIT_LEASE_SECONDS = env_float('RATE_LIMIT_LEASE_SECONDS', 600)
+RATE_LIMIT_BUSY_RETRY_SECONDS = env_int('RATE_LIMIT_BUSY_RETRY_SECONDS', 5)
+
+# Document summaries: per-user rate and burst, plus a host-wide cap on calls in flight
+SUMMARY_RATE_PER_MINUTE = env_float('SUMMARY_RATE_PER_MINUTE', 4)
+SUMMARY_RATE_BURST = env_int('SUMMARY_RATE_BURST', 3)
+SUMMARY_MAX_CONCURRENT = env_int('SUMMARY_MAX_CONCURRENT', 4)
+
+
+LimiterLease = namedtuple('LimiterLease', 'offset key_hash deadline count_hash')
+NO_LEASE = LimiterLease(0, 0, 0.0, 0)
+
+
+class SharedLimiterStore:
+    """
+    Token buckets and concurrency leases in a shared memory-mapped file.
+
+    Layout: a header (magic, slot counts), an open-addressed table of records
+    (key hash, value, updated) holding bucket tokens and in-flight counts,
+    then a flat array of leases (key hash, pid, deadline). Admission only
+    touches a few records; the lease array is scanned just when a limit is
+    reached, to reclaim leases from dead workers and correct the count.
+    """
+
+    MAGIC = b'ESTRL002'
+    HEADER = struct.Struct('<8sII')
+    RECORD = struct.Struct('<Qdd')
+    LEASE = struct.Struct('<Qqd')
+    PROBE = 16
+
+    def __init__(self, path=RATE_LIMIT_FILE, record_slots=RATE_LIMIT_BUCKET_SLOTS, lease_slots=RATE_LIMIT_LEASE_SLOTS):
+        self.path = path
+        self.record_slots = record_slots
+        self.lease_slots = lease_slots
+        self.records_at = self.HEADER.size
+        self.leases_at = self.records_at + record_slots * self.RECORD.size
+        self.size = self.leases_at + lease_slots * self.LEASE.size
+        self._lock = threading.Lock()
+        self._pid = None
+        self._fd = None
+        self._map = None
+        self._next_lease = 0
+
+    @staticmethod
+    def key_hash(key):
+        # Zero marks an empty slot
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little') or 1
+
+    def _open(self):
+        # Opened lazily and again after fork, so every worker maps the same file
+        if self._pid == os.getpid():
+            return
+        if fcntl is None:
+            self._map = mmap.mmap(-1, self.size)
+        else:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            fcntl.lockf(self._fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(self._fd).st_size < self.size:
+                    os.ftruncate(self._fd, self.size)
+                self._map = mmap.mmap(self._fd, self.size)
+                if self.HEADER.unpack_from(self._map, 0) != (self.MAGIC, self.record_slots, self.lease_slots):
+                    # New file or a different layout: start from empty tables
+                    self._map[:] = bytes(self.size)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN)
+        self.HEADER.pack_into(self._map, 0, self.MAGIC, self.record_slots, self.lease_slots)
+        self._pid = os.getpid()
+        self._next_lease = self._pid % self.lease_slots
+
+    @contextmanager
+    def locked(self):
+        # lockf excludes other processes, the thread lock other threads in this one
+        with self._lock:
+            self._open()
+            if fcntl is not None:
+                fcntl.lockf(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.lockf(self._fd, fcntl.LOCK_UN)
+
+    def _record(self, key_hash):
+        """(offset, value, updated) of the key's record; value is None if it has none yet"""
+        start = key_hash % self.record_slots
+        victim = None
+        for probe in range(self.PROBE):
+            offset = self.records_at + ((start + probe) % self.record_slots) * self.RECORD.size
+            slot_hash, value, updated = self.RECORD.unpack_from(self._map, offset)
+            if slot_hash == key_hash:
+                return offset, value, updated
+            if slot_hash == 0:
+                return offset, None, 0.0
+            # Evict the record updated longest ago; an idle bucket is full anyway
+            if victim is None or updated < victim[1]:
+                victim = (offset, updated)
+        return victim[0], None, 0.0
+
+    def _free_lease(self, now):
+        """Offset of an empty or expired lease slot, searching from the last one claimed"""
+        for probe in range(self.lease_slots):
+            index = (self._next_lease + probe) % self.lease_slots
+            offset = self.leases_at + index * self.LEASE.size
+            slot_hash, _, deadline = self.LEASE.unpack_from(self._map, offset)
+            if slot_hash == 0 or deadline <= now:
+                self._next_lease = index + 1
+                return offset
+        return None
+
+    @staticmethod
+    def _pid_alive(pid):
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def _recount(self, key_hash, now):
+        """Live leases for the key, clearing expired ones and those held by dead workers"""
+        live = 0
+        leases = self.LEASE.iter_unpack(self._map[self.leases_at:self.size])
+        for index, (slot_hash, pid, deadline) in enumerate(leases):
+            if slot_hash != key_hash:
+                continue
+            if deadline > now and self._pid_alive(pid):
+                live += 1
+            else:
+                offset = self.leases_at + index * self.LEASE.size
+                self._map[offset:offset + self.LEASE.size] = bytes(self.LEASE.size)
+        return live
+
+    def admit(self, buckets=(), lease=None, lease_seconds=RATE_LIMIT_LEASE_SECONDS):
+        """
+        Take one token from every bucket and, if lease=(key, limit) is given,
+        a concurrency lease, all or nothing. buckets holds (key, rate per
+        second, burst) tuples. Returns (lease, 0) when admitted, or
+        (None, seconds until a retry could succeed) when not.
+        """
+        now = time.time()
+        with self.locked():
+            taken = []
+            for key, rate, burst in buckets:
+                key_hash = self.key_hash(key)
+                offset, tokens, updated = self._record(key_hash)
+                tokens = burst if tokens is None else min(burst, tokens + (now - updated) * rate)
+                if tokens < 1:
+                    return None, math.ceil((1 - tokens) / rate) if rate > 0 else RATE_LIMIT_BUSY_RETRY_SECONDS
+                taken.append((offset, key_hash, tokens - 1))
+            
+            granted = NO_LEASE
+            if lease is not None:
+                key, limit = lease
+                key_hash = self.key_hash(key)
+                count_hash = self.key_hash(key + '#count')
+                count_offset, count, _ = self._record(count_hash)
+                if count is None or count >= limit:
+                    count = self._recount(key_hash, now)
+                free = self._free_lease(now) if count < limit else None
+                if free is None:
+                    self.RECORD.pack_into(self._map, count_offset, count_hash, count, now)
+                    return None, RATE_LIMIT_BUSY_RETRY_SECONDS
+                granted = LimiterLease(free, key_hash, now + lease_seconds, count_hash)
+                self.LEASE.pack_into(self._map, free, key_hash, os.getpid(), granted.deadline)
+                self.RECORD.pack_into(self._map, count_offset, count_hash, count + 1, now)
+            
+            for offset, key_hash, tokens in taken:
+                self.RECORD.pack_into(self._map, offset, key_hash, tokens, now)
+            return granted, 0
+
+    def release(self, lease):
+        if not lease.offset:
+            return
+        with self.locked():
+            slot_hash, pid, deadline = self.LEASE.unpack_from(self._map, lease.offset)
+            # The slot may have expired and been handed to another request since
+            if (slot_hash, pid, deadline) != (lease.key_hash, os.getpid(), lease.deadline):
+                return
+            self._map[lease.offset:lease.offset + self.LEASE.size] = bytes(self.LEASE.size)
+            count_offset, count, _ = self._record(lease.count_hash)
+            if count:
+                self.RECORD.pack_into(self._map, count_offset, lease.count_hash, count - 1, time.time())
+
+    def in_flight(self, key):
+        with self.locked():
+            return self._recount(self.key_hash(key), time.time())
+
+
+limiter_store = SharedLimiterStore()
+RATE_LIMITS = {}
+rate_limit_rejections = TallyCounter()
+
+
+def rate_limited(name, rate_per_minute, burst, max_concurrent=None):
+    """
+    Limit a route to rate_per_minute per user (bursting to burst) and, when
+    max_concurrent is set, to that many requests in flight across all workers.
+    Routes sharing a name share their limits. Streamed responses hold their
+    lease until the stream closes.
+    """
+    RATE_LIMITS[name] = max_concurrent
+    
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not RATE_LIMIT_ENABLED:
+                return f(*args, **kwargs)
+            
+            user_key = current_user.id if current_user.is_authenticated else request.remote_addr
+            buckets = [(f'{name}:user:{user_key}', rate_per_minute / 60.0, burst)] if rate_per_minute else []
+            lease = (f'{name}:in_flight', max_concurrent) if max_concurrent else None
+            granted, retry_after = limiter_store.admit(buckets, lease)
+            if granted is None:
+                rate_limit_rejections[name] += 1
+                log.warning('Rate limited', limit=name, retry_after=retry_after)
+                response = jsonify({'error': 'Too many requests, please try again shortly', 'retry_after': retry_after})
+                response.headers['Retry-After'] = str(retry_after)
+                return response, 429
+            
+            try:
+                response = app.make_response(f(*args, **kwargs))
+            except BaseException:
+                limiter_store.release(granted)
+                raise
+            if response.is_streamed:
+                response.call_on_close(lambda: limiter_store.release(granted))
+            else:
+                limiter_store.release(granted)
+            return response
+        return decorated_function
+    return decorator
+
+
+def _collect_rate_limit_metrics():
+    samples = []
+    for name, max_concurrent in sorted(RATE_LIMITS.items()):
+        if max_concurrent:
+            samples.append(((name, 'in_flight'), limiter_store.in_flight(f'{name}:in_flight')))
+        samples.append(((name, 'rejected'), rate_limit_rejections[name]))
+    return samples
+
+
+METRICS.append(Gauge('rate_limit', 'Requests in flight across workers, and rejections by this worker',
+                     ('limit', 'stat'), _collect_rate_limit_metrics))
+
 # ============= API ROUTES =============
 
+@app.after_request
+def remember_write(response):
+    """Start the read-your-writes window after a successful write request"""
+    if REPLICA_URL and request.method in ('POST', 'PUT', 'PATCH', 'DELETE') and response.status_code < 400:
+        flask_session['last_write_at'] = time.time()
+    return response
+
 @app.route('/')
 def home():
     """Test route to make sure Flask is working"""
@@ -242,16 +2065,16 @@ def home():
 @app.route('/api/test', methods=['GET'])
 def test():
     """Another test route"""
-    return jsonify({'message': 'API is working!', 'timestamp': datetime.utcnow().isoformat()})
+    return jsonify({'message': 'API is working!', 'timestamp': datetime.utcnow()})
 
 @app.route('/api/submissions', methods=['POST'])
 def create_submission():
     """Create a new estate settlement submission"""
     try:
         data = request.get_json()
-        print("=== Received data ===")
-        print(data)
-        print("====================")
+        log.info('Submission received', keys=sorted(data))
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug('Submission payload', payload=redact_payload(data))
         
         # Determine the referral type based on the data
         referral_type = determine_referral_type(
@@ -279,33 +2102,40 @@ def create_submission():
             form_data=json.dumps(data)  # Store complete form data as JSON string
         )
         
+        if AUTO_ASSIGN_ATTORNEYS:
+            submission.attorney_id = pick_attorney(submission.decedent_state, referral_type)
+            if submission.attorney_id is not None:
+                submission.status = 'assigned'
+        
         db.session.add(submission)
         db.session.commit()
         
         return jsonify({
             'message': 'Submission created successfully',
             'submission_id': submission.id,
-            'referral_type': referral_type
+            'referral_type': referral_type,
+            'attorney_id': submission.attorney_id
         }), 201
         
     except Exception as e:
-        print("=== ERROR ===")
-        print(f"Error type: {type(e).__name__}")
-        print(f"Error message: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        print("=============")
+        log.exception('Failed to create submission', error_type=type(e).__name__)
         return jsonify({'error': str(e)}), 400
 
 @app.route('/api/submissions', methods=['GET'])
+@replica_read
 @admin_required
 def get_submissions():
-    """Get all submissions (for admin view)"""
-    submissions = Submission.query.all()
+    """Get all submissions (for admin view), optionally with ?expand=attorney,user"""
+    try:
+        expand = parse_expand()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    submissions = Submission.query.options(*expand_options(expand)).all()
     
     result = []
     for sub in submissions:
-        result.append({
+        result.append(add_expansions({
             'id': sub.id,
             'contact_email': sub.contact_email,
             'decedent_name': f"{sub.decedent_first_name} {sub.decedent_last_name}",
@@ -317,21 +2147,29 @@ def get_submissions():
             'notes': sub.notes,
             'has_document': sub.trust_document_path is not None,  
             'document_filename': sub.trust_document_filename,      
-            'created_at': sub.created_at.isoformat()
-        })
+            'created_at': sub.created_at
+        }, sub, expand))
     
     return jsonify(result)
 
 
 @app.route('/api/my-submissions', methods=['GET'])
+@replica_read
 @login_required
 def get_my_submissions():
-    """Get submissions for the current logged-in user"""
-    submissions = Submission.query.filter_by(user_id=current_user.id).all()
+    """Get submissions for the current logged-in user, optionally with ?expand=attorney,user"""
+    try:
+        expand = parse_expand()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    submissions = Submission.query.options(*expand_options(expand)).filter_by(user_id=current_user.id).all()
+    submissions += ArchivedSubmission.query.options(*expand_options(expand, ArchivedSubmission)).filter_by(
+        user_id=current_user.id).order_by(ArchivedSubmission.id).all()
     
     result = []
     for sub in submissions:
-        result.append({
+        result.append(add_expansions({
             'id': sub.id,
             'contact_email': sub.contact_email,
             'decedent_name': f"{sub.decedent_first_name} {sub.decedent_last_name}",
@@ -342,17 +2180,31 @@ def get_my_submissions():
             'attorney_id': sub.attorney_id,
             'has_document': sub.trust_document_path is not None,  
             'document_filename': sub.trust_document_filename,
-            'created_at': sub.created_at.isoformat(),
-            'updated_at': sub.updated_at.isoformat()
-        })
+            'created_at': sub.created_at,
+            'updated_at': sub.updated_at,
+            'archived': isinstance(sub, ArchivedSubmission)
+        }, sub, expand))
     
     return jsonify(result)
 
 
 @app.route('/api/submissions/<int:submission_id>', methods=['GET'])
+@replica_read
 def get_submission(submission_id):
-    """Get a specific submission by ID"""
-    submission = Submission.query.get_or_404(submission_id)
+    """Get a specific submission by ID, optionally with ?expand=attorney,user"""
+    try:
+        expand = parse_expand()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    submission = find_submission(submission_id, expand)
+    if submission is None:
+        return jsonify({'error': 'Submission not found'}), 404
+    
+    # Related people are only shown to the owner and admins
+    if expand and not (current_user.is_authenticated and
+                       (current_user.is_admin() or submission.user_id == current_user.id)):
+        return jsonify({'error': 'Unauthorized'}), 403
     
     result = {
         'id': submission.id,
@@ -361,7 +2213,7 @@ def get_submission(submission_id):
         'relationship_to_deceased': submission.relationship_to_deceased,
         'decedent_first_name': submission.decedent_first_name,
         'decedent_last_name': submission.decedent_last_name,
-        'decedent_date_of_death': submission.decedent_date_of_death.isoformat() if submission.decedent_date_of_death else None,
+        'decedent_date_of_death': submission.decedent_date_of_death,
         'decedent_state': submission.decedent_state,
         'estate_value': submission.estate_value,
         'has_will': submission.has_will,
@@ -371,17 +2223,19 @@ def get_submission(submission_id):
         'status': submission.status,
         'has_document': submission.trust_document_path is not None, 
         'document_filename': submission.trust_document_filename, 
-        'created_at': submission.created_at.isoformat()
+        'created_at': submission.created_at,
+        'archived': isinstance(submission, ArchivedSubmission)
     }
     
     # Include full form data if available
     if submission.form_data:
-        result['form_data'] = json.loads(submission.form_data)
+        result['form_data'] = RawJSON(submission.form_data)
     
-    return jsonify(result)
+    return jsonify(add_expansions(result, submission, expand))
 
 
 @app.route('/api/attorneys', methods=['GET'])
+@replica_read
 @admin_required
 def get_attorneys():
     """Get all attorneys, optionally filtered by specialty and state"""
@@ -399,18 +2253,7 @@ def get_attorneys():
     if specialty:
         attorneys = [a for a in attorneys if specialty in a.specialties]
     
-    result = []
-    for attorney in attorneys:
-        result.append({
-            'id': attorney.id,
-            'name': f"{attorney.first_name} {attorney.last_name}",
-            'email': attorney.email,
-            'phone': attorney.phone,
-            'state': attorney.state,
-            'specialties': attorney.specialties.split(',') if attorney.specialties else []
-        })
-    
-    return jsonify(result)
+    return jsonify([attorney_to_dict(attorney) for attorney in attorneys])
 
 
 @app.route('/api/attorneys', methods=['POST'])
@@ -419,7 +2262,7 @@ def create_attorney():
     """Create a new attorney (admin only for now)"""
     try:
         data = request.get_json()
-        print("Received data:", data)
+        log.info('Attorney received', payload=redact_payload(data))
         
         attorney = Attorney(
             first_name=data.get('first_name'),
@@ -450,10 +2293,7 @@ def update_submission(submission_id):
         submission = Submission.query.get_or_404(submission_id)
         data = request.get_json()
         
-        print("=== UPDATE SUBMISSION ===")
-        print(f"Submission ID: {submission_id}")
-        print(f"Received data keys: {list(data.keys())}")
-        print("========================")
+        log.info('Submission update received', submission_id=submission_id, keys=sorted(data))
         
         # Check if this is a full form update (has form fields) or just admin updates
         is_form_update = 'contact_email' in data or 'decedent_first_name' in data
@@ -523,11 +2363,246 @@ def update_submission(submission_id):
         }), 200
         
     except Exception as e:
-        print(f"ERROR: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception('Failed to update submission', submission_id=submission_id)
         return jsonify({'error': str(e)}), 400
+
+
+@app.route('/api/submissions/<int:submission_id>/draft', methods=['PATCH'])
+@login_required
+def save_draft(submission_id):
+    """
+    Autosave part of the intake form. Send Content-Type
+    application/merge-patch+json (or plain JSON) with the changed fields, or
+    application/json-patch+json with a list of operations.
+    """
+    submission = db.session.get(Submission, submission_id, with_for_update=True)
+    if submission is None:
+        return jsonify({'error': 'Submission not found'}), 404
+    
+    # Security: users can only edit their own drafts, admins can edit any
+    if submission.user_id != current_user.id and not current_user.is_admin():
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    patch = request.get_json(force=True, silent=True)
+    is_json_patch = request.mimetype == JSON_PATCH_TYPE
+    if patch is None or (is_json_patch and not isinstance(patch, list)) or (not is_json_patch and not isinstance(patch, dict)):
+        return jsonify({'error': 'Expected a JSON Merge Patch object or a JSON Patch list'}), 400
+    if is_json_patch and len(patch) > DRAFT_PATCH_MAX_OPERATIONS:
+        return jsonify({'error': f'At most {DRAFT_PATCH_MAX_OPERATIONS} operations per patch'}), 400
+    
+    try:
+        form_data = json.loads(submission.form_data) if submission.form_data else {}
+        if is_json_patch:
+            paths = patched_paths(patch)
+            updated = apply_json_patch(form_data, patch)
+        else:
+            paths = merge_patch_paths(patch)
+            updated = merge_patch(form_data, patch)
+        
+        if not isinstance(updated, dict):
+            return jsonify({'error': 'form_data must remain a JSON object'}), 400
+        
+        # Replacing the root touches every top-level key of the new document
+        if paths is None:
+            paths = [(key,) for key in updated]
+        
+        log.info('Draft patch received', submission_id=submission_id,
+                 format='json-patch' if is_json_patch else 'merge-patch',
+                 keys=sorted({path[0] for path in paths if path}))
+        
+        columns = sync_form_columns(updated, paths)
+        serialized = json.dumps(updated)
+        if serialized != submission.form_data:
+            referral_inputs = [getattr(submission, name) for name in REFERRAL_INPUTS]
+            apply_form_columns(submission, updated, columns)
+            if (not columns.isdisjoint(REFERRAL_INPUTS)
+                    and [getattr(submission, name) for name in REFERRAL_INPUTS] != referral_inputs):
+                submission.referral_type = determine_referral_type(
+                    estate_value=submission.estate_value or 0,
+                    has_trust=submission.has_trust or False,
+                    has_disputes=submission.has_disputes or False,
+                    state=submission.decedent_state or ''
+                )
+            submission.form_data = serialized
+        
+        db.session.commit()
+        
+        return jsonify({
+            'message': 'Draft saved',
+            'submission_id': submission.id,
+            'referral_type': submission.referral_type
+        }), 200
     
+    except PatchTestFailed as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 409
+    except PatchError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        log.exception('Failed to save draft', submission_id=submission_id)
+        return jsonify({'error': str(e)}), 400
+
+
+# Fields the bulk endpoint may change, and the filters it accepts instead of ids
+BULK_UPDATE_FIELDS = ('status', 'attorney_id', 'notes')
+BULK_UPDATE_FILTERS = ('status', 'attorney_id', 'referral_type', 'decedent_state')
+BULK_UPDATE_MAX = env_int('BULK_UPDATE_MAX', 5000)
+
+
+@app.route('/api/submissions/bulk', methods=['PATCH'])
+@admin_required
+def bulk_update_submissions():
+    """
+    Apply status / attorney_id / notes changes to many submissions at once.
+    Body: {"ids": [1, 2, 3], "changes": {"status": "assigned", "attorney_id": 7}}
+      or: {"filter": {"status": "submitted", "decedent_state": "CA"}, "changes": {...}}
+    Runs as a single UPDATE in one transaction and reports a result per id.
+    """
+    try:
+        data = request.get_json() or {}
+        changes = data.get('changes') or {}
+        
+        if not isinstance(changes, dict):
+            return jsonify({'error': 'changes must be an object'}), 400
+        unknown = set(changes) - set(BULK_UPDATE_FIELDS)
+        if not changes or unknown:
+            return jsonify({'error': f'changes must include only: {list(BULK_UPDATE_FIELDS)}'}), 400
+        
+        if changes.get('attorney_id') is not None and db.session.get(Attorney, changes['attorney_id']) is None:
+            return jsonify({'error': 'Attorney not found'}), 400
+        
+        if 'ids' in data:
+            ids = data['ids']
+            if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+                return jsonify({'error': 'ids must be a list of integers'}), 400
+            if len(ids) > BULK_UPDATE_MAX:
+                return jsonify({'error': f'At most {BULK_UPDATE_MAX} ids per request'}), 400
+            criteria = [Submission.id.in_(ids)]
+        elif 'filter' in data:
+            filters = data['filter'] or {}
+            if not isinstance(filters, dict):
+                return jsonify({'error': 'filter must be an object'}), 400
+            unknown = set(filters) - set(BULK_UPDATE_FILTERS)
+            if not filters or unknown:
+                return jsonify({'error': f'filter must include only: {list(BULK_UPDATE_FILTERS)}'}), 400
+            if not all(value is None or (isinstance(value, (str, int)) and not isinstance(value, bool))
+                       for value in filters.values()):
+                return jsonify({'error': 'filter values must be strings, integers or null'}), 400
+            # Check the match count before writing anything
+            criteria = [getattr(Submission, name) == value for name, value in filters.items()]
+            ids = db.session.execute(
+                db.select(Submission.id).where(*criteria).order_by(Submission.id).limit(BULK_UPDATE_MAX + 1)
+            ).scalars().all()
+            if len(ids) > BULK_UPDATE_MAX:
+                return jsonify({'error': f'Filter matches more than {BULK_UPDATE_MAX} submissions'}), 400
+            criteria.append(Submission.id.in_(ids))
+        else:
+            return jsonify({'error': 'Provide either ids or filter'}), 400
+        
+        statement = (
+            update(Submission)
+            .where(*criteria)
+            .values(**changes, updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        if db.engine.dialect.update_returning:
+            updated = set(db.session.execute(statement.returning(Submission.id)).scalars())
+        else:
+            updated = set(db.session.execute(db.select(Submission.id).where(*criteria)).scalars())
+            db.session.execute(statement)
+        
+        db.session.commit()
+        
+        return jsonify({
+            'message': f'{len(updated)} submission(s) updated',
+            'updated': len(updated),
+            'results': [
+                {'id': submission_id, 'status': 'updated' if submission_id in updated else 'not_found'}
+                for submission_id in ids
+            ]
+        }), 200
+    
+    except Exception as e:
+        db.session.rollback()
+        log.exception('Failed to bulk update submissions')
+        return jsonify({'error': str(e)}), 400
+    
+
+
+@app.route('/api/submissions/<int:submission_id>/assign-attorney', methods=['POST'])
+@admin_required
+def auto_assign_submission(submission_id):
+    """Assign the least-loaded matching attorney to one submission"""
+    try:
+        submission = Submission.query.get_or_404(submission_id)
+        # Same path as the batch endpoint, so the case's current attorney is
+        # released before picking; the flush records the caseload change
+        assignments, _ = assign_attorneys([(submission.id, submission.decedent_state, submission.referral_type,
+                                            submission.attorney_id, submission.status)])
+        attorney_id = assignments[submission.id]
+        if attorney_id is None:
+            return jsonify({'error': 'No active attorney matches this state and referral type'}), 409
+        
+        submission.attorney_id = attorney_id
+        submission.status = 'assigned'
+        db.session.commit()
+        
+        return jsonify({
+            'message': 'Attorney assigned successfully',
+            'submission_id': submission.id,
+            'attorney_id': attorney_id
+        }), 200
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+
+
+@app.route('/api/submissions/auto-assign', methods=['POST'])
+@admin_required
+def auto_assign_submissions():
+    """
+    Assign attorneys to a backlog in one pass.
+    Body (optional): {"ids": [...]} to (re)assign those open submissions;
+    defaults to every open, unassigned submission.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        query = db.select(Submission.id, Submission.decedent_state, Submission.referral_type,
+                          Submission.attorney_id, Submission.status)
+        query = query.where(open_status_clause())
+        if 'ids' in data:
+            query = query.where(Submission.id.in_(data['ids']))
+        else:
+            query = query.where(Submission.attorney_id.is_(None))
+        
+        assignments, deltas = assign_attorneys(db.session.execute(query.order_by(Submission.id)).all())
+        
+        rows = [
+            {'id': submission_id, 'attorney_id': attorney_id, 'status': 'assigned', 'updated_at': datetime.utcnow()}
+            for submission_id, attorney_id in assignments.items() if attorney_id is not None
+        ]
+        if rows:
+            # Bulk UPDATE by primary key; the caseload deltas are applied on commit
+            db.session.execute(update(Submission), rows, execution_options={'caseload_tracked': True})
+            db.session.info.setdefault('caseload_deltas', []).extend(deltas)
+        db.session.commit()
+        
+        return jsonify({
+            'message': f'{len(rows)} submission(s) assigned',
+            'assigned': len(rows),
+            'results': [
+                {'id': submission_id, 'attorney_id': attorney_id, 'status': 'assigned' if attorney_id else 'no_match'}
+                for submission_id, attorney_id in assignments.items()
+            ]
+        }), 200
+    
+    except Exception as e:
+        db.session.rollback()
+        log.exception('Failed to auto-assign submissions')
+        return jsonify({'error': str(e)}), 400
 
 
 # Register endpoint
@@ -633,8 +2708,16 @@ def delete_user(user_id):
             if super_admin_count <= 1:
                 return jsonify({'error': 'Cannot delete the last super admin'}), 400
         
-        # Delete user's submissions first
+        # Their documents are removed from S3 in the background after commit
+        for model in (Submission, ArchivedSubmission):
+            schedule_document_cleanup(db.session.execute(
+                db.select(model.trust_document_path).where(
+                    model.user_id == user_id, model.trust_document_path.isnot(None))
+            ).scalars())
+        
+        # Delete user's submissions first, live and archived
         Submission.query.filter_by(user_id=user_id).delete()
+        ArchivedSubmission.query.filter_by(user_id=user_id).delete()
         
         # Delete the user
         db.session.delete(user)
@@ -668,9 +2751,9 @@ def migrate_db():
                 "ALTER TABLE submission ADD COLUMN trust_document_path VARCHAR(500)"
             ))
             db.session.commit()
-            print("Added trust_document_path column")
+            log.info('Added trust_document_path column')
         except Exception as e:
-            print(f"Column might already exist: {e}")
+            log.warning('Column might already exist', column='trust_document_path', error=str(e))
             db.session.rollback()
         
         # Add trust_document_filename column
@@ -679,11 +2762,33 @@ def migrate_db():
                 "ALTER TABLE submission ADD COLUMN trust_document_filename VARCHAR(500)"
             ))
             db.session.commit()
-            print("Added trust_document_filename column")
+            log.info('Added trust_document_filename column')
+        except Exception as e:
+            log.warning('Column might already exist', column='trust_document_filename', error=str(e))
+            db.session.rollback()
+        
+        # Index trust_document_path for the S3 orphan scan and cleanup checks
+        try:
+            db.session.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_submission_trust_document_path ON submission (trust_document_path)"
+            ))
+            db.session.commit()
+            log.info('Added trust_document_path index')
         except Exception as e:
-            print(f"Column might already exist: {e}")
+            log.warning('Could not create index', index='ix_submission_trust_document_path', error=str(e))
             db.session.rollback()
         
+        # SQLite only honours AUTOINCREMENT when the table is created. Without it a
+        # deleted (archived) highest id is reused and clashes with the archive, so
+        # older files need the submission table rebuilt (copy the rows into a table
+        # created by create_all, then rename). Postgres sequences never reuse ids.
+        if db.engine.dialect.name == 'sqlite':
+            table_sql = db.session.execute(text(
+                "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'submission'"
+            )).scalar()
+            if table_sql and 'AUTOINCREMENT' not in table_sql.upper():
+                log.warning('submission table reuses freed ids, rebuild it with AUTOINCREMENT')
+        
         return jsonify({'message': 'Database migration completed!'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -709,8 +2814,100 @@ def add_document_summary_column():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/pool-stats', methods=['GET'])
+@admin_required
+def get_pool_stats():
+    """Database connection pool size, checked out, overflow and wait times"""
+    result = get_pool_status(db.engine)
+    if REPLICA_URL:
+        result['replica'] = get_pool_status(db.engines['replica'])
+    return jsonify(result)
+
+@app.route('/api/profiles', methods=['GET'])
+@admin_required
+def get_profiles():
+    """List saved request profiles, newest first"""
+    if not os.path.isdir(PROFILE_DIR):
+        return jsonify([])
+    
+    result = []
+    for name in os.listdir(PROFILE_DIR):
+        if name.endswith('.json'):
+            with open(os.path.join(PROFILE_DIR, name)) as f:
+                result.append(json.load(f))
+    result.sort(key=lambda summary: summary['created_at'], reverse=True)
+    return jsonify(result)
+
+
+@app.route('/api/profiles/<profile_id>', methods=['GET'])
+@admin_required
+def download_profile(profile_id):
+    """Download a profile as folded stacks for flamegraph tools"""
+    if not REQUEST_ID_PATTERN.match(profile_id):
+        return jsonify({'error': 'Profile not found'}), 404
+    path = os.path.join(PROFILE_DIR, f'{profile_id}.folded')
+    if not os.path.exists(path):
+        return jsonify({'error': 'Profile not found'}), 404
+    return send_from_directory(PROFILE_DIR, f'{profile_id}.folded', mimetype='text/plain', as_attachment=True)
+
+@app.route('/api/maintenance/s3-orphan-scan', methods=['POST'])
+@super_admin_required
+def s3_orphan_scan():
+    """Run one increment of the S3 orphan scan (super admin only)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        result = scan_orphaned_documents(pages=int(data.get('pages', 1)), dry_run=bool(data.get('dry_run', False)))
+        result['sweeper'] = {'deleted': s3_sweeper.deleted, 'failed': s3_sweeper.failed}
+        return jsonify(result), 200
+    except Exception as e:
+        db.session.rollback()
+        log.exception('S3 orphan scan failed')
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/maintenance/archive-submissions', methods=['POST'])
+@super_admin_required
+def archive_submissions_route():
+    """Run one archival pass (super admin only)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        result = archive_submissions(batches=int(data.get('batches', 1)), dry_run=bool(data.get('dry_run', False)))
+        return jsonify(result), 200
+    except Exception as e:
+        db.session.rollback()
+        log.exception('Submission archival failed')
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/submissions/<int:submission_id>/restore', methods=['POST'])
+@admin_required
+def restore_submission(submission_id):
+    """Move an archived submission back to the hot table so it can be edited again"""
+    archived = db.session.get(ArchivedSubmission, submission_id)
+    if archived is None:
+        return jsonify({'error': 'Archived submission not found'}), 404
+    if db.session.get(Submission, submission_id) is not None:
+        return jsonify({'error': 'A live submission already uses this id'}), 409
+    
+    try:
+        submission = Submission(**{name: getattr(archived, name) for name in SUBMISSION_COLUMNS})
+        # A fresh updated_at keeps the archiver from moving it straight back
+        submission.updated_at = datetime.utcnow()
+        db.session.delete(archived)
+        db.session.add(submission)
+        db.session.commit()
+        return jsonify({'message': 'Submission restored', 'submission_id': submission.id}), 200
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'A live submission already uses this id'}), 409
+    except Exception as e:
+        db.session.rollback()
+        log.exception('Failed to restore submission', submission_id=submission_id)
+        return jsonify({'error': str(e)}), 500
+
       # User Management (Super Admin Only)
 @app.route('/api/users', methods=['GET'])
+@replica_read
 @super_admin_required
 def get_users():
     """Get all users for user management (super admin only)"""
@@ -724,7 +2921,7 @@ def get_users():
             'first_name': user.first_name,
             'last_name': user.last_name,
             'role': user.role,
-            'created_at': user.created_at.isoformat()
+            'created_at': user.created_at
         })
     
     return jsonify(result)
@@ -771,6 +2968,7 @@ def update_user_role(user_id):
 
     # State Limits Management (Admin Only)
 @app.route('/api/state-limits', methods=['GET'])
+@replica_read
 @admin_required
 def get_state_limits():
     """Get all state estate limits"""
@@ -782,8 +2980,8 @@ def get_state_limits():
             'id': limit.id,
             'state': limit.state,
             'limit_amount': limit.limit_amount,
-            'created_at': limit.created_at.isoformat(),
-            'updated_at': limit.updated_at.isoformat()
+            'created_at': limit.created_at,
+            'updated_at': limit.updated_at
         })
     
     return jsonify(result)
@@ -876,6 +3074,8 @@ def delete_state_limit(limit_id):
 @login_required
 def upload_document(submission_id):
     """Upload document to S3"""
+    from botocore.exceptions import ClientError
+    
     submission = Submission.query.get_or_404(submission_id)
     
     # Security check
@@ -900,15 +3100,16 @@ def upload_document(submission_id):
         s3_key = f"documents/{unique_filename}"
         
         # Upload to S3
-        s3_client.upload_fileobj(
-            file,
-            S3_BUCKET,
-            s3_key,
-            ExtraArgs={
-                'ContentType': 'application/pdf',
-                'ServerSideEncryption': 'AES256'  # Encrypt at rest
-            }
-        )
+        with track_dependency('s3', 'upload_fileobj'):
+            get_s3_client().upload_fileobj(
+                file,
+                S3_BUCKET,
+                s3_key,
+                ExtraArgs={
+                    'ContentType': 'application/pdf',
+                    'ServerSideEncryption': 'AES256'  # Encrypt at rest
+                }
+            )
         
         # Update database with S3 path
         submission.trust_document_path = s3_key
@@ -921,10 +3122,10 @@ def upload_document(submission_id):
         })
     
     except ClientError as e:
-        print(f"S3 upload error: {e}")
+        log.exception('S3 upload error', submission_id=submission_id)
         return jsonify({'error': 'Failed to upload document'}), 500
     except Exception as e:
-        print(f"Upload error: {e}")
+        log.exception('Upload error', submission_id=submission_id)
         return jsonify({'error': 'Failed to upload document'}), 500
 
 
@@ -932,7 +3133,11 @@ def upload_document(submission_id):
 @login_required
 def download_document(submission_id):
     """Download document from S3"""
-    submission = Submission.query.get_or_404(submission_id)
+    from botocore.exceptions import ClientError
+    
+    submission = find_submission(submission_id)
+    if submission is None:
+        return jsonify({'error': 'Submission not found'}), 404
     
     # Security check
     if submission.user_id != current_user.id and current_user.role not in ['admin', 'super_admin']:
@@ -943,7 +3148,7 @@ def download_document(submission_id):
     
     try:
         # Generate presigned URL (valid for 1 hour)
-        url = s3_client.generate_presigned_url(
+        url = get_s3_client().generate_presigned_url(
             'get_object',
             Params={
                 'Bucket': S3_BUCKET,
@@ -957,59 +3162,32 @@ def download_document(submission_id):
         return redirect(url)
     
     except ClientError as e:
-        print(f"S3 download error: {e}")
+        log.exception('S3 download error', submission_id=submission_id)
         return jsonify({'error': 'Failed to download document'}), 500
 
 
 
-@app.route('/api/submissions/<int:id>/summarize-document', methods=['POST'])
-@login_required
-def summarize_document(id):
-    """Generate AI summary of uploaded document"""
-    import pdfplumber
-    import io
-    from openai import OpenAI
-    
-    submission = Submission.query.get_or_404(id)
-    
-    # Security: users can only summarize their own documents, admins can summarize any
-    if submission.user_id != current_user.id and current_user.role not in ['admin', 'super_admin']:
-        return jsonify({'error': 'Unauthorized'}), 403
-    
-    # Check if document exists
-    if not submission.trust_document_path:
-        return jsonify({'error': 'No document uploaded'}), 404
-    
-    try:
-        # Download file from S3 to memory
-        s3_object = s3_client.get_object(
-            Bucket=S3_BUCKET,
-            Key=submission.trust_document_path
-        )
-        
-        pdf_bytes = s3_object['Body'].read()
-        pdf_file = io.BytesIO(pdf_bytes)
-        
-        # Extract text from PDF
-        text = ""
-        with pdfplumber.open(pdf_file) as pdf:
-            for page in pdf.pages[:15]:  # Limit to first 15 pages
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
-        
-        if not text.strip():
-            return jsonify({'error': 'Could not extract text from document'}), 400
-        
-        # Truncate to fit token limits (roughly 8000 characters = 2500 tokens)
-        text = text[:8000]
-        
-        prompt = f"""Analyze this estate planning document and provide a comprehensive summary.
+# ============= DOCUMENT SUMMARIES =============
+# Long documents are summarized map-reduce style: the full extracted text is
+# split into token-bounded chunks, each chunk is condensed into notes by a
+# concurrent LLM call (at most SUMMARY_MAX_PARALLEL at once per process), and
+# the notes are reduced into the final structured summary. Wall-clock time is
+# roughly one chunk call plus the reduce call. Text that fits in a single
+# chunk is summarized directly with one call.
 
-Document text:
-{text}
+SUMMARY_MODEL = os.environ.get('SUMMARY_MODEL', 'gpt-4')
+SUMMARY_MAP_MODEL = os.environ.get('SUMMARY_MAP_MODEL', SUMMARY_MODEL)
+SUMMARY_CHUNK_TOKENS = env_int('SUMMARY_CHUNK_TOKENS', 3000)
+SUMMARY_MAX_PARALLEL = env_int('SUMMARY_MAX_PARALLEL', 4)
+SUMMARY_MAX_PAGES = env_int('SUMMARY_MAX_PAGES', 500)
+# Notes per chunk are capped well below the chunk size, so every round of
+# re-mapping shrinks them; the round cap guards against pathological settings
+SUMMARY_MAP_MAX_TOKENS = min(500, max(50, SUMMARY_CHUNK_TOKENS // 4))
+SUMMARY_MAX_REDUCE_ROUNDS = env_int('SUMMARY_MAX_REDUCE_ROUNDS', 3)
+
+SUMMARY_SYSTEM_PROMPT = "You are an expert estate planning document analyst. Provide clear, professional summaries that help attorneys and clients understand key document details."
 
-Provide a structured summary with:
+SUMMARY_SECTIONS = """Provide a structured summary with:
 1. **Document Type**: Identify if this is a Trust, Will, Codicil, etc.
 2. **Key Parties**: 
    - Trustor/Testator (person who created the document)
@@ -1022,20 +3200,226 @@ Provide a structured summary with:
 
 Format your response clearly with headers and bullet points where appropriate."""
 
-        # Use new OpenAI client syntax
-        client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-        
-        response = client.chat.completions.create(
-            model="gpt-4",
+
+def _token_encoder():
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(SUMMARY_MODEL)
+    except KeyError:
+        return tiktoken.get_encoding('cl100k_base')
+
+
+def count_tokens(text):
+    """Tokens in text, using tiktoken when installed and ~4 characters per token otherwise"""
+    encoder = _shared_client('tiktoken', lambda: _token_encoder() or False)
+    if encoder:
+        return len(encoder.encode(text))
+    return (len(text) + 3) // 4
+
+
+def iter_chunks(texts, max_tokens=SUMMARY_CHUNK_TOKENS):
+    """
+    Yield chunks of at most max_tokens from an iterable of texts (e.g. pages),
+    breaking between lines where possible. Chunks are yielded as soon as they
+    fill up, so callers can start on them before the whole input is read.
+    """
+    current = []
+    current_tokens = 0
+    for text in texts:
+        for line in text.splitlines(keepends=True):
+            line_tokens = count_tokens(line)
+            if line_tokens > max_tokens:
+                # A single enormous line: cut it into character windows
+                width = max(1, len(line) * max_tokens // line_tokens)
+                pieces = [line[i:i + width] for i in range(0, len(line), width)]
+            else:
+                pieces = [line]
+            for piece in pieces:
+                piece_tokens = line_tokens if len(pieces) == 1 else count_tokens(piece)
+                if current and current_tokens + piece_tokens > max_tokens:
+                    chunk = ''.join(current)
+                    if chunk.strip():
+                        yield chunk
+                    current, current_tokens = [], 0
+                current.append(piece)
+                current_tokens += piece_tokens
+    chunk = ''.join(current)
+    if chunk.strip():
+        yield chunk
+
+
+def chunk_text(text, max_tokens=SUMMARY_CHUNK_TOKENS):
+    """Split text into chunks of at most max_tokens"""
+    return list(iter_chunks([text], max_tokens))
+
+
+def iter_pdf_pages(pdf_bytes):
+    """Yield the text of each page (up to SUMMARY_MAX_PAGES) of a PDF"""
+    import pdfplumber
+    import io
+    
+    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+        for page in pdf.pages[:SUMMARY_MAX_PAGES]:
+            page_text = page.extract_text()
+            # Release the page's parsed objects; long documents add up
+            page.close()
+            if page_text:
+                yield page_text + "\n"
+
+
+def complete(prompt, model=SUMMARY_MODEL, max_tokens=1000, operation='chat.completions', **kwargs):
+    """One chat completion with the summary system prompt"""
+    with track_dependency('openai', operation):
+        return get_openai_client().chat.completions.create(
+            model=model,
             messages=[
-                {"role": "system", "content": "You are an expert estate planning document analyst. Provide clear, professional summaries that help attorneys and clients understand key document details."},
+                {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
                 {"role": "user", "content": prompt}
             ],
             temperature=0.3,
-            max_tokens=1000
+            max_tokens=max_tokens,
+            **kwargs
+        )
+
+
+def summary_pool():
+    """Process-wide thread pool that bounds concurrent chunk calls"""
+    from concurrent.futures import ThreadPoolExecutor
+    return _shared_client('summary_pool', lambda: ThreadPoolExecutor(
+        max_workers=SUMMARY_MAX_PARALLEL, thread_name_prefix='summary'))
+
+
+def summarize_chunk(chunk, index):
+    prompt = f"""This is part {index} of an estate planning document.
+
+Document text:
+{chunk}
+
+Write concise bullet-point notes on what this part contains about: the document type, the parties (trustor/testator, trustees/executors, beneficiaries), assets or property, important provisions, how assets are distributed, and anything unclear or concerning. Only include what appears in this part."""
+    response = complete(prompt, model=SUMMARY_MAP_MODEL, max_tokens=SUMMARY_MAP_MAX_TOKENS,
+                        operation='chat.completions.map')
+    return response.choices[0].message.content
+
+
+class SummaryCancelled(Exception):
+    """The summary was abandoned, e.g. the streaming client disconnected"""
+
+
+def _chunk_result(future, cancelled):
+    if cancelled is None:
+        return future.result()
+    while not cancelled.is_set():
+        try:
+            return future.result(timeout=0.25)
+        except FutureTimeoutError:
+            pass
+    raise SummaryCancelled()
+
+
+def map_chunks(chunks, cancelled=None):
+    """
+    Notes for every chunk, produced concurrently and returned in order. Once
+    the optional cancelled event is set, no more chunks are submitted and
+    queued ones are cancelled. On any error, calls already running are waited
+    for before it propagates, so the caller's limiter lease outlives them.
+    """
+    futures = []
+    try:
+        for index, chunk in enumerate(chunks, start=1):
+            if cancelled is not None and cancelled.is_set():
+                raise SummaryCancelled()
+            futures.append(summary_pool().submit(summarize_chunk, chunk, index))
+        return [_chunk_result(future, cancelled) for future in futures]
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        concurrent.futures.wait(futures)
+        raise
+
+
+def join_notes(notes):
+    return "\n\n".join(f"Part {index}:\n{note}" for index, note in enumerate(notes, start=1))
+
+
+def build_summary_prompt(pages, cancelled=None):
+    """
+    Prompt for the final summary call, from an iterable of page texts, or None
+    if there is no text. A document that fits in one chunk is sent whole.
+    Longer ones are mapped to notes chunk by chunk while the remaining pages
+    are still being extracted; notes too long for one call are mapped again.
+    """
+    chunks = iter_chunks(pages)
+    first = next(chunks, None)
+    if first is None:
+        return None
+    second = next(chunks, None)
+    if second is None:
+        return f"""Analyze this estate planning document and provide a comprehensive summary.
+
+Document text:
+{first}
+
+{SUMMARY_SECTIONS}"""
+    
+    notes = join_notes(map_chunks(itertools.chain([first, second], chunks), cancelled))
+    for _ in range(SUMMARY_MAX_REDUCE_ROUNDS):
+        if count_tokens(notes) <= SUMMARY_CHUNK_TOKENS:
+            break
+        notes = join_notes(map_chunks(chunk_text(notes), cancelled))
+    else:
+        if count_tokens(notes) > SUMMARY_CHUNK_TOKENS:
+            log.warning('Summary notes still exceed one chunk', tokens=count_tokens(notes),
+                        rounds=SUMMARY_MAX_REDUCE_ROUNDS)
+    
+    return f"""Analyze this estate planning document and provide a comprehensive summary.
+The document was too long to read at once, so here are notes taken on each part, in order:
+
+{notes}
+
+{SUMMARY_SECTIONS}"""
+
+
+def summarize_pages(pages):
+    """Structured summary of a document given its page texts, or None if it has no text"""
+    prompt = build_summary_prompt(pages)
+    if prompt is None:
+        return None
+    return complete(prompt).choices[0].message.content
+
+
+def fetch_document_bytes(submission):
+    """A submission's PDF bytes from S3"""
+    with track_dependency('s3', 'get_object'):
+        s3_object = get_s3_client().get_object(
+            Bucket=S3_BUCKET,
+            Key=submission.trust_document_path
         )
+        return s3_object['Body'].read()
+
+
+@app.route('/api/submissions/<int:id>/summarize-document', methods=['POST'])
+@login_required
+@rate_limited('summarize', SUMMARY_RATE_PER_MINUTE, SUMMARY_RATE_BURST, SUMMARY_MAX_CONCURRENT)
+def summarize_document(id):
+    """Generate AI summary of uploaded document"""
+    submission = Submission.query.get_or_404(id)
+    
+    # Security: users can only summarize their own documents, admins can summarize any
+    if submission.user_id != current_user.id and current_user.role not in ['admin', 'super_admin']:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    # Check if document exists
+    if not submission.trust_document_path:
+        return jsonify({'error': 'No document uploaded'}), 404
+    
+    try:
+        summary = summarize_pages(iter_pdf_pages(fetch_document_bytes(submission)))
         
-        summary = response.choices[0].message.content
+        if summary is None:
+            return jsonify({'error': 'Could not extract text from document'}), 400
         
         # Save summary to database
         submission.document_summary = summary
@@ -1047,15 +3431,116 @@ Format your response clearly with headers and bullet points where appropriate.""
         })
     
     except Exception as e:
-        print(f"Error summarizing document: {e}")
+        log.exception('Error summarizing document', submission_id=id)
         return jsonify({'error': f'Failed to summarize document: {str(e)}'}), 500
 
+
+SSE_HEARTBEAT_SECONDS = env_float('SSE_HEARTBEAT_SECONDS', 10)
+
+
+def sse_event(event, data):
+    """One server-sent event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def run_in_background(fn, *args):
+    """Run fn on its own thread and return a Future for the result"""
+    future = Future()
+    
+    def target():
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+    
+    threading.Thread(target=target, name='summary-prepare', daemon=True).start()
+    return future
+
+
+@app.route('/api/submissions/<int:id>/summarize-document/stream', methods=['POST'])
+@login_required
+@rate_limited('summarize', SUMMARY_RATE_PER_MINUTE, SUMMARY_RATE_BURST, SUMMARY_MAX_CONCURRENT)
+def stream_document_summary(id):
+    """
+    Streaming variant of summarize-document using server-sent events:
+      event: status  {"stage": "reading" | "writing"}  while the document is prepared
+      event: token   {"text": "..."}                    as completion tokens arrive
+      event: done    {"success": true}                  after the summary is saved
+      event: error   {"error": "..."}
+    Comment lines keep the connection alive during long map phases.
+    """
+    submission = Submission.query.get_or_404(id)
+    
+    # Security: users can only summarize their own documents, admins can summarize any
+    if submission.user_id != current_user.id and current_user.role not in ['admin', 'super_admin']:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    if not submission.trust_document_path:
+        return jsonify({'error': 'No document uploaded'}), 404
+    
+    def generate():
+        cancelled = threading.Event()
+        prepared = None
+        stream = None
+        yield sse_event('status', {'stage': 'reading'})
+        try:
+            # Download, extraction and the map phase run off this thread so
+            # heartbeats can be sent while they work
+            prepared = run_in_background(
+                lambda: build_summary_prompt(iter_pdf_pages(fetch_document_bytes(submission)), cancelled))
+            while True:
+                try:
+                    prompt = prepared.result(timeout=SSE_HEARTBEAT_SECONDS)
+                    break
+                except FutureTimeoutError:
+                    yield ": keep-alive\n\n"
+            
+            if prompt is None:
+                yield sse_event('error', {'error': 'Could not extract text from document'})
+                return
+            
+            yield sse_event('status', {'stage': 'writing'})
+            parts = []
+            stream = complete(prompt, stream=True, operation='chat.completions.stream')
+            for chunk in stream:
+                text = chunk.choices[0].delta.content if chunk.choices else None
+                if text:
+                    parts.append(text)
+                    yield sse_event('token', {'text': text})
+            
+            # The request's session may have been torn down while streaming,
+            # so load the row again before saving the summary
+            db.session.get(Submission, id).document_summary = ''.join(parts)
+            db.session.commit()
+            yield sse_event('done', {'success': True})
+        
+        except Exception as e:
+            db.session.rollback()
+            log.exception('Error streaming document summary', submission_id=id)
+            yield sse_event('error', {'error': f'Failed to summarize document: {str(e)}'})
+        
+        finally:
+            # If the client went away, stop the map phase and wait for calls
+            # already running, so the concurrency lease (released when the
+            # response closes) covers all of this request's OpenAI work
+            cancelled.set()
+            if stream is not None and hasattr(stream, 'close'):
+                stream.close()
+            if prepared is not None:
+                concurrent.futures.wait([prepared])
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 # ============= RUN THE APP =============
 if __name__ == '__main__':
     # Create database tables if they don't exist
     with app.app_context():
         db.create_all()
-        print("Database tables created!")
+        log.info('Database tables created')
     
     # Run the Flask development server
     app.run(debug=True, port=5000)
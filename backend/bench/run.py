@@ -0,0 +1,275 @@
+"""
+Load test for the API against local stand-ins.
+
+Boots the app in-process against a fresh SQLite file (or --database-url for a
+local Postgres), replaces S3 and OpenAI with in-memory stand-ins, seeds
+realistic data and drives a weighted mix of workloads from several threads.
+Reports throughput and p50/p95/p99 latency per workload.
+
+Usage (from backend/):
+    python bench/run.py                                   # 100k submissions, 30s
+    python bench/run.py --submissions 5000 --duration 10  # quick run
+    python bench/run.py --save-baseline bench/baseline.json
+    python bench/run.py --compare bench/baseline.json     # exit 1 on regression
+"""
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from seed import PASSWORD, intake_payload, seed  # noqa: E402
+from standins import FakeOpenAIClient, FakeS3Client, make_pdf  # noqa: E402
+
+DEFAULT_MIX = 'create=20,list=1,my_submissions=30,poll=40,upload=6,summarize=3'
+
+
+def parse_mix(spec):
+    mix = {}
+    for item in spec.split(','):
+        name, weight = item.split('=', 1)
+        mix[name.strip()] = float(weight)
+    unknown = set(mix) - set(WORKLOADS)
+    if unknown:
+        raise SystemExit(f"Unknown workloads: {', '.join(sorted(unknown))} (choose from {', '.join(WORKLOADS)})")
+    return mix
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+# ============= WORKLOADS =============
+# Each workload takes the worker state and returns the response status code.
+
+def create(worker):
+    return worker.user.post('/api/submissions', json=intake_payload(worker.rng)).status_code
+
+
+def list_submissions(worker):
+    return worker.admin.get('/api/submissions').status_code
+
+
+def my_submissions(worker):
+    return worker.user.get('/api/my-submissions').status_code
+
+
+def poll(worker):
+    submission_id = worker.rng.choice(worker.own_ids)
+    return worker.user.get(f'/api/submissions/{submission_id}').status_code
+
+
+def upload(worker):
+    submission_id = worker.rng.choice(worker.own_ids)
+    response = worker.user.post(
+        f'/api/upload-document/{submission_id}',
+        data={'file': (io.BytesIO(worker.pdf), 'trust.pdf')},
+        content_type='multipart/form-data'
+    )
+    return response.status_code
+
+
+def summarize(worker):
+    submission_id = worker.rng.choice(worker.document_ids)
+    return worker.admin.post(f'/api/submissions/{submission_id}/summarize-document').status_code
+
+
+WORKLOADS = {
+    'create': create,
+    'list': list_submissions,
+    'my_submissions': my_submissions,
+    'poll': poll,
+    'upload': upload,
+    'summarize': summarize
+}
+
+
+class Worker:
+    """One simulated user session plus an admin session"""
+
+    def __init__(self, app_module, index, seeded, pdf):
+        self.rng = random.Random(index)
+        self.pdf = pdf
+        owners = sorted(seeded['client_submissions'])
+        email = owners[index % len(owners)]
+        self.own_ids = seeded['client_submissions'][email]
+        self.document_ids = [submission_id for submission_id, _ in seeded['documents']] or self.own_ids
+        self.user = self._login(app_module, email)
+        self.admin = self._login(app_module, seeded['admin_email'])
+
+    @staticmethod
+    def _login(app_module, email):
+        client = app_module.app.test_client()
+        response = client.post('/api/login', json={'email': email, 'password': PASSWORD})
+        if response.status_code != 200:
+            raise SystemExit(f'Login failed for {email}: {response.status_code}')
+        return client
+
+
+def drive(workers, mix, duration, warmup):
+    """Run every worker until the deadline; returns {workload: [(latency, status)]}"""
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    results = {name: [] for name in names}
+    lock = threading.Lock()
+    start = time.perf_counter()
+    measure_from = start + warmup
+    deadline = measure_from + duration
+
+    def loop(worker):
+        local = {name: [] for name in names}
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            name = worker.rng.choices(names, weights)[0]
+            began = time.perf_counter()
+            try:
+                status = WORKLOADS[name](worker)
+            except Exception:
+                status = 599
+            if began >= measure_from:
+                local[name].append((time.perf_counter() - began, status))
+        with lock:
+            for name, samples in local.items():
+                results[name].extend(samples)
+
+    threads = [threading.Thread(target=loop, args=(worker,)) for worker in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def summarize_results(results, duration):
+    report = {}
+    for name, samples in results.items():
+        latencies = sorted(latency for latency, _ in samples)
+        errors = sum(1 for _, status in samples if status >= 400)
+        report[name] = {
+            'requests': len(samples),
+            'errors': errors,
+            'throughput_rps': round(len(samples) / duration, 2),
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 2)
+        }
+    total = sum(entry['requests'] for entry in report.values())
+    report['_total'] = {'requests': total, 'throughput_rps': round(total / duration, 2)}
+    return report
+
+
+def print_report(report, baseline=None):
+    print(f"{'workload':<16} {'reqs':>7} {'err':>5} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  vs baseline")
+    for name, entry in sorted(report.items()):
+        if name.startswith('_'):
+            continue
+        delta = ''
+        if baseline and name in baseline and baseline[name]['p95_ms']:
+            change = entry['p95_ms'] / baseline[name]['p95_ms'] - 1
+            delta = f'p95 {change:+.0%}'
+        print(f"{name:<16} {entry['requests']:>7} {entry['errors']:>5} {entry['throughput_rps']:>9} "
+              f"{entry['p50_ms']:>9} {entry['p95_ms']:>9} {entry['p99_ms']:>9}  {delta}")
+    print(f"{'total':<16} {report['_total']['requests']:>7} {'':>5} {report['_total']['throughput_rps']:>9}")
+
+
+def find_regressions(report, baseline, tolerance):
+    """Workloads whose p95 grew or throughput fell by more than the tolerance"""
+    regressions = []
+    for name, entry in report.items():
+        if name.startswith('_') or name not in baseline:
+            continue
+        before = baseline[name]
+        if before['p95_ms'] and entry['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']}ms -> {entry['p95_ms']}ms")
+        if before['throughput_rps'] and entry['throughput_rps'] < before['throughput_rps'] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {before['throughput_rps']} -> {entry['throughput_rps']} rps")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', help='empty database to use instead of a temporary SQLite file')
+    parser.add_argument('--submissions', type=int, default=100000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--attorneys', type=int, default=200)
+    parser.add_argument('--documents', type=int, default=500, help='seeded submissions that have a PDF in S3')
+    parser.add_argument('--pdf-pages', type=int, default=20)
+    parser.add_argument('--duration', type=float, default=30, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=3, help='unmeasured seconds before measuring')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'workload weights (default: {DEFAULT_MIX})')
+    parser.add_argument('--s3-latency', type=float, default=0.02, help='simulated seconds per S3 call')
+    parser.add_argument('--openai-latency', type=float, default=1.0, help='simulated seconds per completion')
+    parser.add_argument('--save-baseline', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='baseline JSON to compare against; exit 1 on regression')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed regression fraction')
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    # The app reads its configuration at import time
+    workdir = tempfile.mkdtemp(prefix='estate_bench_')
+    os.environ['DATABASE_URL'] = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ.setdefault('DB_POOL_SIZE', str(args.concurrency * 2))
+    # Every worker shares one admin session, which the per-user limits would throttle
+    os.environ.setdefault('RATE_LIMIT_ENABLED', 'false')
+    import app as app_module
+
+    app_module.app.config['SESSION_COOKIE_SECURE'] = False
+    s3 = FakeS3Client(latency=args.s3_latency)
+    app_module._clients['s3'] = s3
+    app_module._clients['openai'] = FakeOpenAIClient(latency=args.openai_latency)
+
+    with app_module.app.app_context():
+        app_module.db.create_all()
+        if app_module.Submission.query.first() is not None:
+            raise SystemExit('The benchmark database must be empty')
+        started = time.perf_counter()
+        seeded = seed(app_module, submissions=args.submissions, users=args.users,
+                      attorneys=args.attorneys, documents=args.documents)
+        print(f'Seeded {args.submissions} submissions in {time.perf_counter() - started:.1f}s')
+
+    pdf = make_pdf(args.pdf_pages)
+    for _, key in seeded['documents']:
+        s3.put(key, pdf)
+
+    workers = [Worker(app_module, index, seeded, pdf) for index in range(args.concurrency)]
+    print(f'Running {args.duration:.0f}s with {args.concurrency} workers, mix {args.mix}')
+    results = drive(workers, mix, args.duration, args.warmup)
+    report = summarize_results(results, args.duration)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+    print_report(report, baseline)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump({'args': vars(args), 'results': report}, f, indent=2)
+        print(f'Saved baseline to {args.save_baseline}')
+
+    if baseline:
+        regressions = find_regressions(report, baseline, args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
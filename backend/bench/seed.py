@@ -0,0 +1,181 @@
+"""
+Realistic seed data for benchmarks: users, attorneys, state limits and
+submissions whose form_data matches what the intake form actually sends.
+"""
+import json
+import random
+from datetime import datetime, timedelta
+
+STATES = [
+    'AL', 'AK', 'AZ', 'AR', 'CA', 'CO', 'CT', 'DE', 'FL', 'GA', 'HI', 'ID', 'IL', 'IN', 'IA', 'KS', 'KY',
+    'LA', 'ME', 'MD', 'MA', 'MI', 'MN', 'MS', 'MO', 'MT', 'NE', 'NV', 'NH', 'NJ', 'NM', 'NY', 'NC', 'ND',
+    'OH', 'OK', 'OR', 'PA', 'RI', 'SC', 'SD', 'TN', 'TX', 'UT', 'VT', 'VA', 'WA', 'WV', 'WI', 'WY'
+]
+REFERRAL_TYPES = ['affidavit', 'informal', 'formal', 'trust']
+STATUSES = ['submitted', 'in_review', 'assigned', 'in_progress', 'completed', 'closed']
+ASSET_TYPES = [
+    'primary_residence', 'other_real_property', 'business', 'bank_accounts', 'investment_accounts',
+    'life_insurance', 'annuities', 'stocks_bonds', 'vehicles', 'boats', 'rvs'
+]
+FIRST_NAMES = ['James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda', 'David', 'Susan']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Martinez', 'Lopez']
+
+# Every seeded user shares this password; hashing once keeps seeding fast
+PASSWORD = 'benchmark-password'
+
+
+def _person(rng):
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    return {
+        'name': f'{first} {last}',
+        'email': f'{first.lower()}.{last.lower()}{rng.randint(1, 99999)}@example.com',
+        'phone': f'555-{rng.randint(100, 999)}-{rng.randint(1000, 9999)}',
+        'address': f'{rng.randint(1, 9999)} {rng.choice(LAST_NAMES)} Street, Springfield, {rng.choice(STATES)} {rng.randint(10000, 99999)}'
+    }
+
+
+def intake_payload(rng):
+    """A complete intake form payload, flat fields plus the nested form structure"""
+    contact = _person(rng)
+    decedent = _person(rng)
+    state = rng.choice(STATES)
+    assets = [
+        {
+            'type': rng.choice(ASSET_TYPES),
+            'description': 'Account or property held at ' + rng.choice(LAST_NAMES) + ' Bank & Trust, see statements',
+            'estimatedValue': rng.randint(1000, 400000),
+            'ownership': rng.choice(['sole', 'co-owned']),
+            'hasNamedBeneficiaries': rng.random() < 0.4,
+            'fundedIntoTrust': rng.random() < 0.3,
+            'coOwnerInfo': '',
+            'beneficiaryInfo': ''
+        }
+        for _ in range(rng.randint(3, 12))
+    ]
+    total = sum(asset['estimatedValue'] for asset in assets)
+    has_trust = rng.random() < 0.25
+    has_disputes = rng.random() < 0.1
+    children = [_person(rng) for _ in range(rng.randint(0, 5))]
+    flat = {
+        'contact_email': contact['email'],
+        'contact_phone': contact['phone'],
+        'relationship_to_deceased': rng.choice(['child', 'spouse', 'sibling', 'friend']),
+        'decedent_first_name': decedent['name'].split(' ')[0],
+        'decedent_last_name': decedent['name'].split(' ')[1],
+        'decedent_date_of_death': (datetime(2024, 1, 1) + timedelta(days=rng.randint(0, 600))).strftime('%Y-%m-%d'),
+        'decedent_state': state,
+        'estate_value': total,
+        'has_will': True,
+        'has_trust': has_trust,
+        'has_disputes': has_disputes
+    }
+    return {
+        **flat,
+        'contactInfo': {**contact, 'relationshipToDecedent': flat['relationship_to_deceased'], 'isExecutor': rng.random() < 0.5},
+        'decedentInfo': {
+            'name': decedent['name'],
+            'dateOfBirth': '1940-05-17',
+            'dateOfDeath': flat['decedent_date_of_death'],
+            'domicileState': state,
+            'diedInDomicileState': True
+        },
+        'isMarried': rng.random() < 0.6,
+        'spouseInfo': _person(rng),
+        'hasChildren': bool(children),
+        'children': children,
+        'representativeInfo': {**_person(rng), 'reasonForRepresenting': 'Named as personal representative in the will'},
+        'hasEstatePlan': has_trust,
+        'estatePlanType': 'trust' if has_trust else 'will',
+        'hasContestingBeneficiaries': has_disputes,
+        'contestingBeneficiariesInfo': '',
+        'assets': assets,
+        'totalNetAssetValue': total,
+        'assetsInDomicileState': True,
+        'referralType': 'trust_administration' if has_trust else 'informal_probate'
+    }
+
+
+def seed(app_module, submissions=100000, users=1000, attorneys=200, documents=500, seed_value=1, batch_size=5000):
+    """
+    Populate an empty database. Returns a dict describing what was created:
+    the admin email, client emails mapped to their submission ids, and the ids
+    of submissions that have a document.
+    """
+    from sqlalchemy import insert
+
+    rng = random.Random(seed_value)
+    db = app_module.db
+    password_hash = app_module.bcrypt.generate_password_hash(PASSWORD).decode('utf-8')
+    now = datetime.utcnow()
+
+    db.session.execute(insert(app_module.User), [
+        {'email': 'admin@bench.local', 'password_hash': password_hash, 'role': 'super_admin', 'first_name': 'Bench', 'last_name': 'Admin'}
+    ] + [
+        {'email': f'client{i}@bench.local', 'password_hash': password_hash, 'role': 'client', 'first_name': 'Client', 'last_name': str(i)}
+        for i in range(users)
+    ])
+    db.session.execute(insert(app_module.StateLimit), [
+        {'state': state, 'limit_amount': rng.choice([50000, 100000, 150000, 184500]), 'created_at': now, 'updated_at': now}
+        for state in STATES
+    ])
+    db.session.execute(insert(app_module.Attorney), [
+        {
+            'first_name': rng.choice(FIRST_NAMES), 'last_name': rng.choice(LAST_NAMES),
+            'email': f'attorney{i}@bench.local', 'phone': '555-000-0000', 'state': rng.choice(STATES),
+            'specialties': ','.join(rng.sample(REFERRAL_TYPES, rng.randint(1, 4))), 'is_active': True, 'created_at': now
+        }
+        for i in range(attorneys)
+    ])
+    db.session.commit()
+
+    user_ids = [row.id for row in db.session.execute(
+        db.select(app_module.User.id).where(app_module.User.role == 'client').order_by(app_module.User.id))]
+    emails = {user_id: f'client{index}@bench.local' for index, user_id in enumerate(user_ids)}
+
+    rows = []
+    for index in range(submissions):
+        payload = intake_payload(rng)
+        created = now - timedelta(minutes=rng.randint(0, 60 * 24 * 365))
+        rows.append({
+            'user_id': rng.choice(user_ids),
+            'contact_email': payload['contact_email'],
+            'contact_phone': payload['contact_phone'],
+            'relationship_to_deceased': payload['relationship_to_deceased'],
+            'decedent_first_name': payload['decedent_first_name'],
+            'decedent_last_name': payload['decedent_last_name'],
+            'decedent_date_of_death': datetime.strptime(payload['decedent_date_of_death'], '%Y-%m-%d').date(),
+            'decedent_state': payload['decedent_state'],
+            'estate_value': payload['estate_value'],
+            'has_will': True,
+            'has_trust': payload['has_trust'],
+            'has_disputes': payload['has_disputes'],
+            'referral_type': rng.choice(REFERRAL_TYPES),
+            'status': rng.choice(STATUSES),
+            'attorney_id': rng.randint(1, attorneys) if rng.random() < 0.5 else None,
+            'trust_document_path': f'documents/bench_{index}.pdf' if index < documents else None,
+            'trust_document_filename': 'trust.pdf' if index < documents else None,
+            'form_data': json.dumps(payload),
+            'created_at': created,
+            'updated_at': created
+        })
+        if len(rows) >= batch_size:
+            db.session.execute(insert(app_module.Submission), rows)
+            db.session.commit()
+            rows = []
+    if rows:
+        db.session.execute(insert(app_module.Submission), rows)
+        db.session.commit()
+
+    owned = {}
+    document_ids = []
+    for row in db.session.execute(db.select(
+            app_module.Submission.id, app_module.Submission.user_id, app_module.Submission.trust_document_path)):
+        owned.setdefault(emails[row.user_id], []).append(row.id)
+        if row.trust_document_path:
+            document_ids.append((row.id, row.trust_document_path))
+
+    return {
+        'admin_email': 'admin@bench.local',
+        'client_submissions': owned,
+        'documents': document_ids
+    }
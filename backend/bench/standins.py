@@ -0,0 +1,134 @@
+"""
+Local stand-ins for S3 and OpenAI so benchmarks run without network access.
+
+They are installed into the app's shared client registry, so routes call them
+exactly like the real SDK clients.
+"""
+import io
+import threading
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+
+class FakeS3Client:
+    """In-memory S3 with the subset of the boto3 client API the app uses"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.objects = {}
+        self.modified = {}
+        self._lock = threading.Lock()
+
+    def _wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def put(self, key, body, last_modified=None):
+        with self._lock:
+            self.objects[key] = body
+            self.modified[key] = last_modified or datetime.now(timezone.utc)
+
+    def upload_fileobj(self, fileobj, bucket, key, ExtraArgs=None):
+        self._wait()
+        self.put(key, fileobj.read())
+
+    def get_object(self, Bucket, Key):
+        self._wait()
+        with self._lock:
+            body = self.objects[Key]
+        return {'Body': io.BytesIO(body), 'ContentLength': len(body)}
+
+    def delete_objects(self, Bucket, Delete):
+        self._wait()
+        with self._lock:
+            for item in Delete['Objects']:
+                self.objects.pop(item['Key'], None)
+                self.modified.pop(item['Key'], None)
+        return {}
+
+    def list_objects_v2(self, Bucket, Prefix='', MaxKeys=1000, StartAfter=''):
+        self._wait()
+        with self._lock:
+            keys = sorted(key for key in self.objects if key.startswith(Prefix) and key > StartAfter)
+            contents = [{'Key': key, 'LastModified': self.modified[key], 'Size': len(self.objects[key])}
+                        for key in keys[:MaxKeys]]
+        return {'Contents': contents, 'KeyCount': len(contents), 'IsTruncated': len(keys) > MaxKeys}
+
+    def generate_presigned_url(self, operation, Params, ExpiresIn=3600):
+        return f"https://{Params['Bucket']}.s3.local/{Params['Key']}?expires={ExpiresIn}"
+
+
+class FakeOpenAIClient:
+    """Returns a canned completion after a fixed delay, like a slow LLM call"""
+
+    SUMMARY = (
+        "**Document Type**: Revocable Living Trust\n"
+        "**Key Parties**:\n- Trustor: Jane Doe\n- Trustee: John Doe\n- Beneficiaries: Children in equal shares\n"
+        "**Major Assets or Property**: Primary residence, brokerage account\n"
+        "**Important Provisions**: Successor trustee powers\n"
+        "**Distribution Plan**: Equal distribution upon death of trustor\n"
+        "**Red Flags or Concerns**: None identified"
+    )
+
+    def __init__(self, latency=0.5):
+        self.latency = latency
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, stream=False, **kwargs):
+        self.calls += 1
+        if stream:
+            return self._stream()
+        time.sleep(self.latency)
+        message = SimpleNamespace(content=self.SUMMARY)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    def _stream(self):
+        # Latency is spread over the tokens, with the first one arriving quickly
+        words = self.SUMMARY.split(' ')
+        for index, word in enumerate(words):
+            time.sleep(self.latency / len(words))
+            text = word if index == 0 else ' ' + word
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+def make_pdf(pages, lines_per_page=40):
+    """Build a small text-only PDF with the given number of pages"""
+    objects = []
+    page_ids = []
+    font_id = 3
+    next_id = 4
+    for page_number in range(pages):
+        text_lines = [
+            f"Article {page_number + 1}.{line + 1}: The trustee shall hold, manage and distribute the trust estate."
+            for line in range(lines_per_page)
+        ]
+        stream = "BT /F1 10 Tf 50 750 Td 14 TL " + " ".join(f"({line}) '" for line in text_lines) + " ET"
+        content_id, page_id = next_id, next_id + 1
+        next_id += 2
+        objects.append((content_id, f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream"))
+        objects.append((page_id, (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Contents {content_id} 0 R /Resources << /Font << /F1 {font_id} 0 R >> >> >>"
+        )))
+        page_ids.append(page_id)
+
+    objects.insert(0, (1, "<< /Type /Catalog /Pages 2 0 R >>"))
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+    objects.insert(1, (2, f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>"))
+    objects.insert(2, (font_id, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"))
+    objects.sort()
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = {}
+    for object_id, body in objects:
+        offsets[object_id] = out.tell()
+        out.write(f"{object_id} 0 obj\n{body}\nendobj\n".encode('latin-1'))
+    xref_at = out.tell()
+    out.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+    for object_id, _ in objects:
+        out.write(f"{offsets[object_id]:010d} 00000 n \n".encode())
+    out.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_at}\n%%EOF\n".encode())
+    return out.getvalue()
@@ -0,0 +1,23 @@
+# Gunicorn settings, picked up automatically by `gunicorn app:app` (see Procfile)
+import os
+
+# Import the app once in the master so workers share its memory copy-on-write
+# and start serving without re-importing Flask, SQLAlchemy and friends.
+# Set GUNICORN_PRELOAD=false to import the app separately in every worker.
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def post_fork(server, worker):
+    """Give each worker its own database connections, SDK clients and log thread"""
+    if not preload_app:
+        return
+    
+    import app as application
+    
+    # Connections opened in the master must not be shared across processes
+    with application.app.app_context():
+        for engine in application.db.engines.values():
+            engine.dispose(close=False)
+    application.reset_shared_clients()
+    # Threads do not survive fork, so each worker needs its own log writer
+    application.start_log_listener()
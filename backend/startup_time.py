@@ -0,0 +1,68 @@
+"""
+Measure how long `import app` takes, broken down by top-level module.
+
+Usage:
+    python startup_time.py              # print the slowest imports
+    python startup_time.py --max-ms 800 # exit 1 if startup exceeds the budget
+
+Uses Python's built-in `-X importtime` so the numbers match what a gunicorn
+worker pays on a cold start.
+"""
+import argparse
+import subprocess
+import sys
+from collections import defaultdict
+
+
+def measure_imports():
+    """Return ({module imported by app: cumulative microseconds}, total microseconds)"""
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app'],
+        capture_output=True,
+        text=True
+    )
+    if completed.returncode != 0:
+        sys.stderr.write(completed.stderr)
+        sys.exit(completed.returncode)
+    
+    totals = {}
+    total = 0
+    pending = defaultdict(int)
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or '[us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Each nesting level adds two spaces of indentation after the first
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            pending[name.strip()] += int(cumulative)
+        elif depth == 0:
+            # Children are reported just before their parent, so the depth-1
+            # lines since the previous top-level import belong to this one
+            if name.strip() == 'app':
+                totals, total = dict(pending), int(cumulative)
+            pending.clear()
+    return totals, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--top', type=int, default=15, help='number of modules to show')
+    parser.add_argument('--max-ms', type=float, help='fail if total startup import time exceeds this')
+    args = parser.parse_args()
+    
+    totals, total = measure_imports()
+    total_ms = total / 1000
+    
+    print(f"{'module':<40} {'ms':>10}")
+    for name, micros in sorted(totals.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"{name:<40} {micros / 1000:>10.1f}")
+    print(f"{'total (import app)':<40} {total_ms:>10.1f}")
+    
+    if args.max_ms is not None and total_ms > args.max_ms:
+        print(f"Startup import time {total_ms:.1f}ms exceeds budget of {args.max_ms:.1f}ms")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -99,6 +99,24 @@ async createAttorney(data: any) {
     
     return response.json();
   },
+
+  // Autosave only the fields that changed, as a JSON Merge Patch of form_data
+  async saveDraft(id: number, patch: Record<string, unknown>) {
+    const response = await fetch(`${API_URL}/api/submissions/${id}/draft`, {
+      method: 'PATCH',
+      headers: {
+        'Content-Type': 'application/merge-patch+json',
+      },
+      credentials: 'include',
+      body: JSON.stringify(patch),
+    });
+
+    if (!response.ok) {
+      throw new Error('Failed to save draft');
+    }
+
+    return response.json();
+  },
  // Authentication methods
 async register(data: { email: string; password: string; first_name?: string; last_name?: string; role?: string }) {
     const response = await fetch(`${API_URL}/api/register`, {
@@ -300,6 +318,55 @@ async summarizeDocument(submissionId: number): Promise<{ summary: string; succes
   return response.json();
 },
 
+// Streams the summary as it is written; onText receives the text so far
+async summarizeDocumentStream(submissionId: number, onText: (text: string) => void): Promise<string> {
+  const response = await fetch(`${API_URL}/api/submissions/${submissionId}/summarize-document/stream`, {
+    method: 'POST',
+    credentials: 'include',
+  });
+
+  if (!response.ok || !response.body) {
+    const error = await response.json().catch(() => ({}));
+    throw new Error(error.error || 'Failed to summarize document');
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let summary = '';
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    // Server-sent events are separated by a blank line
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const block = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+
+      let event = 'message';
+      let data = '';
+      for (const line of block.split('\n')) {
+        if (line.startsWith('event: ')) event = line.slice(7);
+        else if (line.startsWith('data: ')) data += line.slice(6);
+      }
+      if (!data) continue;
+
+      const payload = JSON.parse(data);
+      if (event === 'token') {
+        summary += payload.text;
+        onText(summary);
+      } else if (event === 'error') {
+        throw new Error(payload.error || 'Failed to summarize document');
+      }
+    }
+  }
+
+  return summary;
+},
+
 
 };
 
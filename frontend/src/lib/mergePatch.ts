@@ -0,0 +1,34 @@
+// Build a JSON Merge Patch (RFC 7396) describing how `after` differs from `before`.
+// Objects are diffed key by key, arrays and other values are sent whole, and
+// removed keys become null. Returns null when nothing changed.
+
+const isObject = (value: unknown): value is Record<string, unknown> =>
+  typeof value === 'object' && value !== null && !Array.isArray(value);
+
+export function createMergePatch(before: unknown, after: unknown): Record<string, unknown> | null {
+  if (!isObject(before) || !isObject(after)) {
+    return null;
+  }
+
+  const patch: Record<string, unknown> = {};
+
+  for (const key of Object.keys(before)) {
+    if (before[key] !== undefined && after[key] === undefined) {
+      patch[key] = null;
+    }
+  }
+
+  for (const [key, value] of Object.entries(after)) {
+    if (value === undefined) continue;
+    const previous = before[key];
+
+    if (isObject(previous) && isObject(value)) {
+      const nested = createMergePatch(previous, value);
+      if (nested) patch[key] = nested;
+    } else if (JSON.stringify(previous) !== JSON.stringify(value)) {
+      patch[key] = value;
+    }
+  }
+
+  return Object.keys(patch).length > 0 ? patch : null;
+}
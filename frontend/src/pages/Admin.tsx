@@ -545,8 +545,7 @@ const handleAddAttorney = async () => {
         onClick={async () => {
           setSummarizing(true);
           try {
-            const result = await api.summarizeDocument(editingSubmission.id);
-            setDocumentSummary(result.summary);
+            await api.summarizeDocumentStream(editingSubmission.id, setDocumentSummary);
             toast.success('Document summarized successfully');
           } catch (error: any) {
             console.error('Summarize error:', error);
@@ -1,4 +1,4 @@
-import { useState, useEffect } from "react";
+import { useState, useEffect, useRef } from "react";
 import { useSearchParams, useNavigate } from "react-router-dom";
 import { Card } from "@/components/ui/card";
 import Header from "@/components/Header";
@@ -12,6 +12,7 @@ import { AssetsStep } from "@/components/intake/AssetsStep";
 import { ReviewStep } from "@/components/intake/ReviewStep";
 import { IntakeFormData } from "@/types/intake";
 import { api } from "@/integrations/supabase/client";
+import { createMergePatch } from "@/lib/mergePatch";
 import { toast } from "sonner";
 import { ArrowLeft } from "lucide-react";
 
@@ -47,6 +48,8 @@ const IntakeForm = () => {
   const [currentStep, setCurrentStep] = useState(1);
   const [formData, setFormData] = useState<IntakeFormData>({});
   const [submissionId, setSubmissionId] = useState<number | null>(null);
+  // form_data as last stored on the server, so autosave only sends what changed
+  const savedFormData = useRef<IntakeFormData | null>(null);
 
 // useEffect - Pre-fill contact info with logged-in user's data
 useEffect(() => {
@@ -124,6 +127,7 @@ useEffect(() => {
       if (submission.form_data.contactInfo) {
         // New format - already nested, use as-is
         setFormData(submission.form_data);
+        savedFormData.current = submission.form_data;
       } else {
         // Old format - flat structure, needs transformation
 const transformedData: IntakeFormData = {
@@ -181,6 +185,26 @@ setFormData(transformedData);
     });
   };
 
+  // Autosave whenever the step changes. Steps call updateFormData right before
+  // navigating, so this runs after the render that includes the step being left.
+  // Failures are retried with the next step change.
+  useEffect(() => {
+    if (!submissionId || !savedFormData.current) return;
+
+    const patch = createMergePatch(savedFormData.current, formData);
+    if (!patch) return;
+
+    const saving = formData;
+    api.saveDraft(submissionId, patch)
+      .then(() => {
+        savedFormData.current = saving;
+      })
+      .catch((error) => {
+        console.error('Error autosaving draft:', error);
+      });
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [currentStep]);
+
   const handleNext = () => {
     setCurrentStep((prev) => Math.min(prev + 1, steps.length));
   };
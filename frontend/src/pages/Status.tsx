@@ -113,8 +113,7 @@ const Status = () => {
   
   setSummarizing(true);
   try {
-    const result = await api.summarizeDocument(submission.id);
-    setSummary(result.summary);
+    await api.summarizeDocumentStream(submission.id, setSummary);
   } catch (error: any) {
     console.error("Error summarizing document:", error);
     alert(error.message || "Failed to summarize document");